@@ -17,16 +17,32 @@ if "bpy" in locals():
 
     imp.reload(addon_updater_ops)
     imp.reload(analytics)
+    imp.reload(animated_prompts)
+    imp.reload(backend_metadata)
+    imp.reload(cancellation)
     imp.reload(config)
     imp.reload(handlers)
+    imp.reload(http_pool)
+    imp.reload(http_streaming)
+    imp.reload(image_buffers)
+    imp.reload(image_pool)
+    imp.reload(manifest)
     imp.reload(operators)
     imp.reload(preferences)
     imp.reload(progress_bar)
+    imp.reload(progress_poller)
     imp.reload(properties)
+    imp.reload(result_cache)
+    imp.reload(scene_fingerprint)
+    imp.reload(server_health)
+    imp.reload(server_pool)
     imp.reload(task_queue)
+    imp.reload(temp_files)
+    imp.reload(tiling)
     imp.reload(ui_panels)
     imp.reload(ui_preset_styles)
     imp.reload(utils)
+    imp.reload(worker)
     imp.reload(automatic1111_api)
     imp.reload(stability_api)
     imp.reload(stablehorde_api)
@@ -34,14 +50,30 @@ else:
     from . import (
         addon_updater_ops,
         analytics,
+        animated_prompts,
+        backend_metadata,
+        cancellation,
         config,
         handlers,
+        http_pool,
+        http_streaming,
+        image_buffers,
+        image_pool,
+        manifest,
         operators,
         preferences,
         progress_bar,
+        progress_poller,
         properties,
+        result_cache,
+        scene_fingerprint,
+        server_health,
+        server_pool,
         task_queue,
+        temp_files,
+        tiling,
         utils,
+        worker,
     )
     from .ui import (
         ui_panels,
@@ -59,25 +91,34 @@ import bpy
 def register():
     addon_updater_ops.register(bl_info)
     analytics.register(bl_info)
+    backend_metadata.register()
     handlers.register()
     operators.register()
     preferences.register()
     progress_bar.register()
     properties.register()
+    server_health.register()
     task_queue.register()
     ui_panels.register()
     ui_preset_styles.register()
 
 
 def unregister():
+    # clean up temp files first, while the scene properties (which say which files are
+    # still in use) are still registered
+    temp_files.unregister()
     addon_updater_ops.unregister()
     analytics.unregister()
+    backend_metadata.unregister()
     handlers.unregister()
+    http_pool.unregister()
     operators.unregister()
     preferences.unregister()
     progress_bar.unregister()
     properties.unregister()
+    server_health.unregister()
     task_queue.unregister()
+    worker.unregister()
     ui_panels.unregister()
     ui_preset_styles.unregister()
 
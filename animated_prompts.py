@@ -0,0 +1,80 @@
+import bisect
+import re
+
+
+# matches a keyframe line, like "1: a beautiful landscape"
+line_pattern = re.compile(r'^(\d+):(.*)')
+
+# private
+cached_key = None
+cached_timelines = None
+
+
+class PromptTimeline:
+    """Prompts keyed by the frame they start on. Looking up the prompt for a frame is a
+    binary search over the start frames"""
+
+    def __init__(self, lines):
+        lines = sorted(lines, key=lambda line: line[0])
+        self.start_frames = [start_frame for start_frame, prompt in lines]
+        self.prompts = [prompt for start_frame, prompt in lines]
+
+        # ensure the first frame is 1
+        if self.start_frames:
+            self.start_frames[0] = 1
+
+    def __len__(self):
+        return len(self.prompts)
+
+    def get_prompt_at_frame(self, frame):
+        index = bisect.bisect_right(self.start_frames, frame) - 1
+        if index < 0:
+            return ""
+        return self.prompts[index]
+
+
+def split_positive_and_negative_lines(text):
+    lines = [line.strip() for line in text.splitlines()]
+
+    # find "Negative:" in lines, if it exists
+    for i, line in enumerate(lines):
+        if line.lower() == "negative:":
+            return lines[:i], lines[i+1:]
+
+    return lines, []
+
+
+def parse_lines(lines, process_prompt=None, is_positive=True):
+    processed_lines = []
+    for line in lines:
+        m = line_pattern.match(line)
+        if m:
+            start_frame = int(m.group(1))
+            prompt = m.group(2).strip()
+            if process_prompt:
+                prompt = process_prompt(prompt)
+            processed_lines.append((start_frame, prompt))
+
+    if is_positive:
+        processed_lines = [line for line in processed_lines if line[1] != ""]
+
+    return PromptTimeline(processed_lines)
+
+
+# public methods
+def get_timelines(text, process_prompt, process_prompt_key):
+    """Parse animated prompt text into positive and negative timelines. The last result is
+    cached, keyed on the text plus process_prompt_key (whatever settings process_prompt
+    depends on), so unchanged text isn't parsed again"""
+    global cached_key, cached_timelines
+
+    key = (text, process_prompt_key)
+    if key != cached_key:
+        positive_lines, negative_lines = split_positive_and_negative_lines(text)
+        cached_timelines = (
+            parse_lines(positive_lines, process_prompt),
+            parse_lines(negative_lines, is_positive=False),
+        )
+        cached_key = key
+
+    return cached_timelines
@@ -0,0 +1,162 @@
+import bpy
+import concurrent.futures
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from . import (
+    config,
+    operators,
+    utils,
+    worker,
+)
+
+
+# fetched lists (upscaler models, ControlNet models, etc) are cached on disk for each
+# server, and fetched again after this long (in seconds)
+cache_ttl = 6 * 60 * 60
+
+cache_subfolder = "metadata"
+
+# private
+cache_lock = threading.Lock()
+refreshing = set()
+
+
+def get_cache_path():
+    return os.path.join(tempfile.gettempdir(), config.tmp_path_subfolder, cache_subfolder)
+
+
+def get_cache_file(server_url):
+    return os.path.join(get_cache_path(), hashlib.sha256(server_url.encode()).hexdigest()[:16] + ".json")
+
+
+def read_cache(server_url):
+    try:
+        with open(get_cache_file(server_url), "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {"server_url": server_url, "lists": {}}
+
+
+def write_cache(server_url, lists, failed_names):
+    """Update a server's cached lists, dropping the ones that failed to fetch (so stale
+    lists aren't used after the server changes)"""
+    with cache_lock:
+        entry = read_cache(server_url)
+        entry["lists"].update({name: {"items": items, "fetched_at": time.time()} for name, items in lists.items()})
+        for name in failed_names:
+            entry["lists"].pop(name, None)
+
+        try:
+            os.makedirs(get_cache_path(), exist_ok=True)
+            with open(get_cache_file(server_url) + ".tmp", "w") as file:
+                json.dump(entry, file)
+            os.replace(get_cache_file(server_url) + ".tmp", get_cache_file(server_url))
+        except OSError as e:
+            print(f"AI Render Warning: Couldn't save the server metadata cache: {e}")
+
+
+def is_fresh(entry, names):
+    now = time.time()
+    return all(name in entry["lists"] and now - entry["lists"][name]["fetched_at"] < cache_ttl for name in names)
+
+
+def fetch_all(fetchers, server_url, props):
+    """Fetch every list at the same time (this runs on a background worker). Returns the
+    fetched lists and the error messages for the ones that failed"""
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(fetchers), thread_name_prefix="ai-render-metadata") as executor:
+        futures = {name: executor.submit(fetcher, server_url, props) for name, fetcher in fetchers.items()}
+
+    lists = {}
+    errors = {}
+    for name, future in futures.items():
+        try:
+            lists[name] = future.result()
+        except Exception as e:
+            errors[name] = str(e)
+
+    write_cache(server_url, lists, errors.keys())
+    return lists, errors
+
+
+def apply_lists(sd_backend, lists):
+    # every scene in the file uses the same server, so they all get the lists
+    for scene in bpy.data.scenes:
+        sd_backend.apply_metadata(scene, lists)
+
+
+def finish_refresh(sd_backend, server_url, refresh_key, show_errors, on_refreshed, result):
+    # (runs in the main thread)
+    refreshing.discard(refresh_key)
+    if not result:
+        return
+    lists, errors = result
+
+    # skip the lists if the backend or server changed while they were being fetched
+    if utils.get_active_backend() is sd_backend and get_server_url() == server_url:
+        apply_lists(sd_backend, lists)
+        if on_refreshed:
+            on_refreshed()
+
+    for name, message in errors.items():
+        if show_errors:
+            operators.handle_error(message, "load_server_metadata")
+        else:
+            print(f"AI Render Warning: {message}")
+
+
+def get_server_url():
+    return utils.local_sd_url().rstrip("/").strip()
+
+
+# public methods
+def refresh(force=False, show_errors=False, on_refreshed=None, names=None):
+    """Make sure every scene has the current backend's server lists. Cached lists are
+    applied right away, and stale (or missing) ones are fetched in the background, so
+    this never blocks. Pass names to only check (and report errors for) those lists"""
+    sd_backend = utils.get_active_backend()
+    fetchers = sd_backend.get_metadata_fetchers()
+    if names is not None:
+        fetchers = {name: fetcher for name, fetcher in fetchers.items() if name in names}
+    server_url = get_server_url()
+    if not fetchers or not server_url:
+        return
+
+    entry = read_cache(server_url)
+    apply_lists(sd_backend, {name: cached["items"] for name, cached in entry["lists"].items()})
+    if not force and is_fresh(entry, fetchers.keys()):
+        return
+
+    # only fetch the same lists from each server once at a time
+    refresh_key = (server_url, tuple(sorted(fetchers)))
+    if refresh_key in refreshing:
+        return
+    refreshing.add(refresh_key)
+
+    worker.submit(
+        functools.partial(fetch_all, fetchers, server_url, utils.snapshot_preferences()),
+        functools.partial(finish_refresh, sd_backend, server_url, refresh_key, show_errors, on_refreshed),
+    )
+
+
+def refresh_handler(self, context):
+    refresh()
+
+
+def refresh_after_startup():
+    # (the scenes aren't available while the add-on is registering)
+    refresh()
+    return None
+
+
+def register():
+    bpy.app.timers.register(refresh_after_startup, first_interval=1)
+
+
+def unregister():
+    if bpy.app.timers.is_registered(refresh_after_startup):
+        bpy.app.timers.unregister(refresh_after_startup)
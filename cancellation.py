@@ -0,0 +1,92 @@
+import threading
+import time
+from . import (
+    server_health,
+    utils,
+    worker,
+)
+
+
+# how long to keep stopping requests on the server after a cancel (in seconds)
+max_cancel_duration = 120
+
+# private
+generation = 0
+is_canceling = False
+generation_lock = threading.Lock()
+
+
+def cancel_backend_requests(sd_backend, server_urls, api_key, cancel_generation):
+    """Keep asking the backend to stop our requests until none are left running (servers
+    can queue requests, and only stop the one they're working on), or until something new
+    starts. This runs on a background thread, so the settings are read beforehand"""
+    deadline = time.monotonic() + max_cancel_duration
+    while is_canceling and generation == cancel_generation and time.monotonic() < deadline:
+        try:
+            if not sd_backend.cancel_requests(server_urls, api_key):
+                return
+        except Exception as e:
+            print(f"AI Render Warning: Couldn't cancel the requests on the server: {e}")
+            return
+        time.sleep(1)
+
+
+# public methods
+def begin():
+    """Start new work (after a cancel, errors from the canceled work are ignored until this
+    is called)"""
+    global is_canceling
+    is_canceling = False
+
+
+def get_generation():
+    """Get the current generation number. Jobs remember it, so they can tell if they've
+    been canceled since they were created"""
+    return generation
+
+
+def is_cancelled(job_generation):
+    return job_generation != generation
+
+
+def is_canceling_work():
+    """Check if work was canceled and nothing new has started since"""
+    return is_canceling
+
+
+def sleep(seconds, job_generation):
+    """Sleep, but wake up early if the work is canceled. Returns False if it was canceled"""
+    deadline = time.monotonic() + seconds
+    while not is_cancelled(job_generation):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return True
+        time.sleep(min(remaining, 0.25))
+    return False
+
+
+def cancel():
+    """Cancel all work in flight: drop the queued work, let the running work know it's
+    been canceled, and stop the requests on the server (in the background, so we don't
+    wait for the server). Returns the thread that's stopping the requests"""
+    global generation, is_canceling
+    with generation_lock:
+        generation += 1
+        cancel_generation = generation
+    is_canceling = True
+
+    worker.cancel_queued()
+
+    # read the servers and api key the backend needs here, in the main thread
+    backend = utils.sd_backend()
+    server_urls = server_health.get_server_urls()
+    api_key = utils.get_stable_horde_api_key() if backend == "stablehorde" else utils.get_dream_studio_api_key()
+
+    thread = threading.Thread(
+        target=cancel_backend_requests,
+        args=(utils.get_active_backend(), server_urls, api_key, cancel_generation),
+        name="ai-render-cancel",
+        daemon=True,
+    )
+    thread.start()
+    return thread
@@ -0,0 +1,105 @@
+"""Split an AI Render batch across several Blender processes on this machine.
+
+Usage:
+    python coordinator.py --blend my-scene.blend --frames 1-100 --output /renders/ai-frames --workers 4 [-- headless options]
+
+This creates a manifest in the output folder, launches the workers (each one runs
+headless.py in background mode), and relaunches any worker that dies while there are
+still frames to do (its claimed frames go back to the others). Workers on other machines
+can join in by running headless.py with --manifest pointed at the same manifest file.
+
+Exits with status 0 if every frame was generated, and 1 otherwise.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import manifest  # noqa: E402
+
+
+poll_interval = 2
+
+
+def parse_frames(frames):
+    frames, _, step = frames.partition(":")
+    start, _, end = frames.partition("-")
+    return list(range(int(start), int(end or start) + 1, int(step or 1)))
+
+
+def parse_args(argv):
+    # everything after "--" is passed through to each worker
+    worker_argv = []
+    if "--" in argv:
+        worker_argv = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+
+    parser = argparse.ArgumentParser(description="Split an AI Render batch across several Blender processes")
+    parser.add_argument("--blender", default="blender", help="the Blender executable")
+    parser.add_argument("--blend", required=True, help="the blend file to render")
+    parser.add_argument("--frames", required=True, help='the frames to generate ("1-100" or "1-100:2")')
+    parser.add_argument("--output", required=True, help="where to save the generated frames (and the manifest)")
+    parser.add_argument("--workers", type=int, default=2, help="how many Blender processes to run")
+    parser.add_argument("--max-restarts", type=int, default=3, help="how many times to relaunch each worker that dies")
+    parser.add_argument("--retry-failed", action="store_true", help="try frames that failed in a previous run again")
+    return parser.parse_args(argv), worker_argv
+
+
+def launch_worker(args, worker_id, manifest_file, worker_argv):
+    command = [
+        args.blender, "-b", args.blend,
+        "--python", os.path.join(os.path.dirname(os.path.abspath(__file__)), "headless.py"),
+        "--",
+        "--output", args.output,
+        "--manifest", manifest_file,
+        "--worker-id", worker_id,
+    ] + worker_argv
+    print(f"Launching worker {worker_id}")
+    return subprocess.Popen(command)
+
+
+def main(argv):
+    args, worker_argv = parse_args(argv)
+    output_path = os.path.abspath(args.output)
+    os.makedirs(output_path, exist_ok=True)
+
+    frame_manifest = manifest.Manifest(manifest.get_manifest_file(output_path))
+    frame_manifest.add_frames(parse_frames(args.frames))
+    if args.retry_failed:
+        frame_manifest.retry_failed()
+
+    workers = {
+        f"worker-{i + 1}": launch_worker(args, f"worker-{i + 1}", frame_manifest.path, worker_argv)
+        for i in range(args.workers)
+    }
+    restarts = {worker_id: 0 for worker_id in workers}
+
+    while workers:
+        time.sleep(poll_interval)
+
+        for worker_id, process in list(workers.items()):
+            if process.poll() is None:
+                continue
+
+            del workers[worker_id]
+
+            # give back anything the worker claimed but didn't finish
+            frame_manifest.release_worker(worker_id)
+
+            # if it died while there's still work to do, launch it again
+            counts = frame_manifest.get_counts()
+            if counts["pending"] > 0 and restarts[worker_id] < args.max_restarts:
+                print(f"Worker {worker_id} exited with status {process.returncode}, relaunching")
+                restarts[worker_id] += 1
+                workers[worker_id] = launch_worker(args, worker_id, frame_manifest.path, worker_argv)
+
+    counts = frame_manifest.get_counts()
+    print(f"Done: {counts['done']}, failed: {counts['failed']}, not finished: {counts['pending'] + counts['claimed']}")
+    return 0 if counts["done"] == sum(counts.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -5,7 +5,9 @@ from . import (
     operators,
     preferences,
     properties,
+    scene_fingerprint,
     task_queue,
+    temp_files,
     utils,
 )
 
@@ -28,6 +30,12 @@ def load_post_handler(loaded_filename):
     # update the sd backend to migrate a possible old value from a previous installation
     preferences.update_sd_backend_from_previous_installation(context)
 
+    # forget the last render from the previous file
+    scene_fingerprint.clear()
+
+    # remove any temp files the previous file was using (and that this one isn't)
+    temp_files.cleanup(utils.temp_files_max_size(context))
+
 
 @persistent
 def render_init_handler(scene):
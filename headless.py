@@ -0,0 +1,347 @@
+"""Run AI Render from the command line, without any UI (for batch jobs and render farms).
+
+Usage:
+    blender -b my-scene.blend --python path/to/AI-Render/headless.py -- [options]
+
+Options (or put the same keys in a JSON file, and pass --config settings.json):
+    --frames 1-100            the frames to generate ("5", "1-100" or "1-100:2")
+    --backend automatic1111   the Stable Diffusion backend to use
+    --servers URL[,URL...]    local server URLs (Automatic1111 spreads frames across them)
+    --output //ai-frames/     where to save the generated frames
+    --frames-in-flight 4      how many frames to send to Stable Diffusion at once
+    --manifest auto           share the frames with other workers through a manifest file
+                              ("auto" puts it in the output folder)
+    --worker-id node1-gpu0    this worker's name in the manifest (defaults to host and pid)
+    --shard-size 8            how many frames to claim from the manifest at a time
+
+With a manifest, each worker claims a few frames at a time until none are left, and
+frames claimed by a worker that stops checking in are given to the others. Run
+coordinator.py to launch several workers at once (or start more on other machines
+with the same manifest).
+
+Every other setting comes from the blend file (and the add-on preferences). Exits with
+status 0 if every frame was generated, 1 if any frame failed, and 2 for invalid options.
+"""
+
+import addon_utils
+import argparse
+import bpy
+import concurrent.futures
+import importlib
+import json
+import os
+import socket
+import sys
+import threading
+
+
+EXIT_SUCCESS = 0
+EXIT_GENERATION_FAILED = 1
+EXIT_INVALID_OPTIONS = 2
+
+# how long to wait for the server to stop our requests, after being canceled (in seconds)
+cancel_timeout = 30
+
+# how often to tell the manifest this worker is still alive, while it generates frames (in
+# seconds, well within the manifest's worker timeout)
+heartbeat_interval = 60
+
+backend_choices = ["dreamstudio", "stablehorde", "automatic1111", "shark"]
+
+
+def get_script_argv():
+    # blender passes everything after "--" through to the script
+    if "--" in sys.argv:
+        return sys.argv[sys.argv.index("--") + 1:]
+    return []
+
+
+def parse_frames(frames, scene):
+    """Parse a frame range like "5", "1-100" or "1-100:2" (defaulting to the scene's range)"""
+    if not frames:
+        return list(range(scene.frame_start, scene.frame_end + 1, scene.frame_step))
+
+    frames, _, step = str(frames).partition(":")
+    start, _, end = frames.partition("-")
+    return list(range(int(start), int(end or start) + 1, int(step or 1)))
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(prog="blender -b file.blend --python headless.py --", description="Generate AI Render frames without the UI")
+    parser.add_argument("--config", help="a JSON file with any of these options")
+    parser.add_argument("--frames", help='the frames to generate ("5", "1-100" or "1-100:2")')
+    parser.add_argument("--backend", choices=backend_choices, help="the Stable Diffusion backend")
+    parser.add_argument("--servers", help="comma separated local server URLs")
+    parser.add_argument("--output", help="where to save the generated frames")
+    parser.add_argument("--frames-in-flight", type=int, help="how many frames to send at once")
+    parser.add_argument("--manifest", help='a manifest file to share the frames with other workers ("auto" for one in the output folder)')
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}", help="this worker's name in the manifest")
+    parser.add_argument("--shard-size", type=int, help="how many frames to claim from the manifest at a time")
+    return parser
+
+
+def parse_args(argv):
+    parser = create_parser()
+    args = parser.parse_args(argv)
+
+    # use the JSON config for anything that wasn't given on the command line
+    if args.config:
+        with open(args.config, "r") as file:
+            config = json.load(file)
+        parser.set_defaults(**{key.replace("-", "_"): value for key, value in config.items()})
+        args = parser.parse_args(argv)
+
+    return args
+
+
+def load_addon():
+    """Enable the add-on this script is in (if it isn't already), and return its modules"""
+    package_name = os.path.basename(os.path.dirname(os.path.abspath(__file__)))
+    if not addon_utils.enable(package_name, default_set=False):
+        raise RuntimeError(f"Couldn't enable the {package_name} add-on")
+
+    return {name: importlib.import_module(f"{package_name}.{name}") for name in ["cancellation", "manifest", "operators", "scene_fingerprint", "task_queue", "utils", "worker"]}
+
+
+def apply_args(args, scene, utils):
+    props = scene.air_props
+    preferences = utils.get_addon_preferences()
+
+    if args.backend:
+        preferences.sd_backend = args.backend
+    if args.servers:
+        servers = [server.strip() for server in str(args.servers).split(",") if server.strip()]
+        preferences.local_sd_url = servers[0]
+        preferences.local_sd_extra_urls = ",".join(servers[1:])
+    if args.output:
+        props.animation_output_path = args.output
+
+        # create the output folder, so the frames (and the manifest) can be saved in it
+        os.makedirs(utils.get_absolute_path_for_output_file(args.output, ""), exist_ok=True)
+    if args.frames_in_flight:
+        props.animation_max_frames_in_flight = args.frames_in_flight
+
+
+def wait_for_frames(futures, task_queue, return_when):
+    """Wait for frames to finish. Blender's timers don't run while this script does, so
+    this runs the add-on's main thread tasks itself (tiled frames are blended there)"""
+    while True:
+        task_queue.execute_queued_functions()
+        done, not_done = concurrent.futures.wait(futures, timeout=0.1, return_when=return_when)
+        if (done and return_when == concurrent.futures.FIRST_COMPLETED) or not not_done:
+            return done
+
+
+def get_prompts_function(scene, operators):
+    """Get a function that returns the prompts for any frame (or None on error)"""
+    props = scene.air_props
+    if props.use_animated_prompts:
+        animated_prompts, animated_negative_prompts = operators.validate_and_process_animated_prompt_text(scene)
+        if not animated_prompts:
+            return None
+        return lambda frame: {
+            "prompt": operators.get_prompt_at_frame(animated_prompts, frame),
+            "negative_prompt": operators.get_prompt_at_frame(animated_negative_prompts, frame),
+        }
+
+    prompts = {
+        "prompt": operators.get_full_prompt(scene),
+        "negative_prompt": props.negative_prompt_text.strip(),
+    }
+    return lambda frame: prompts
+
+
+def generate_frames(context, frames, modules, on_frame_complete=None):
+    """Render each frame and send it to Stable Diffusion, keeping up to the scene's max frames
+    in flight. Rendering happens here in the main thread, while earlier frames are
+    generated on worker threads. on_frame_complete(frame, job, result) is called for
+    every frame (result is False if it failed). Returns the list of frames that failed"""
+    operators, utils, worker = modules["operators"], modules["utils"], modules["worker"]
+    scene = context.scene
+    props = scene.air_props
+
+    def fail_all():
+        # (so the frames are recorded as failed, instead of staying claimed)
+        if on_frame_complete:
+            for frame in frames:
+                on_frame_complete(frame, None, False)
+        return frames
+
+    if not (operators.validate_params(scene, can_tile=True) and operators.validate_animation_output_path(scene)):
+        return fail_all()
+    operators.do_pre_render_setup(scene)
+    operators.do_pre_api_setup(scene)
+
+    # don't reuse a render from before this run (edits since then aren't all fingerprinted)
+    modules["scene_fingerprint"].clear()
+
+    get_prompts = get_prompts_function(scene, operators)
+    if not get_prompts:
+        return fail_all()
+
+    max_frames_in_flight = props.animation_max_frames_in_flight
+    if utils.sd_backend() == "automatic1111":
+        max_frames_in_flight = max(max_frames_in_flight, len(utils.local_sd_urls()))
+    worker.ensure_max_workers(max_frames_in_flight)
+
+    frame_seeds = operators.get_animation_frame_seeds(scene, frames)
+    failed_frames = []
+    in_flight = {}
+    previous_job = None
+    previous_future = None
+
+    def finish(futures):
+        for future in futures:
+            frame, job = in_flight.pop(future)
+            result = worker.get_result(future)
+            if result:
+                props.last_generated_image_filename = result["last_generated_image_filename"]
+                print(f"AI Render: Frame {frame} saved to {result['generated_image_file']}")
+            else:
+                failed_frames.append(frame)
+                print(f"AI Render: Frame {frame} failed")
+            if on_frame_complete:
+                on_frame_complete(frame, job, result)
+
+    # the render_complete handler leaves frames alone while this is set
+    props.is_rendering_animation_manually = True
+    try:
+        for frame in frames:
+            # wait for a free slot
+            while len(in_flight) >= max_frames_in_flight:
+                finish(wait_for_frames(in_flight, modules["task_queue"], concurrent.futures.FIRST_COMPLETED))
+
+            job = operators.render_frame(context, frame, get_prompts(frame), frame_seeds[frame])
+            if not job:
+                failed_frames.append(frame)
+                if on_frame_complete:
+                    on_frame_complete(frame, None, False)
+                continue
+
+            # frames that look the same as the previous one reuse its image
+            operators.mark_duplicate_frame(scene, job, previous_job)
+            previous_job = job
+            previous_future = operators.submit_frame_job(job, previous_future)
+            in_flight[previous_future] = (frame, job)
+
+        finish(wait_for_frames(in_flight, modules["task_queue"], concurrent.futures.ALL_COMPLETED))
+    finally:
+        props.is_rendering_animation_manually = False
+
+    return failed_frames
+
+
+def get_manifest(args, scene, modules):
+    manifest_file = args.manifest
+    if manifest_file == "auto":
+        output_path = modules["utils"].get_absolute_path_for_output_file(scene.air_props.animation_output_path, "")
+        manifest_file = modules["manifest"].get_manifest_file(output_path)
+    return modules["manifest"].Manifest(manifest_file)
+
+
+def generate_frames_from_manifest(context, manifest, worker_id, shard_size, modules):
+    """Claim frames from the manifest a shard at a time, and generate them, until there
+    are none left. Returns the list of frames this worker processed, and the list of
+    frames that failed"""
+    started_frames = set()
+
+    def record_frame(frame, job, result):
+        info = {}
+        if job:
+            started_frames.add(frame)
+            params = job["params"]
+            info["seed"] = params["seed"]
+            info["prompt_hash"] = modules["manifest"].get_prompt_hash(params["prompt"], params["negative_prompt"])
+        # if the manifest can't be updated, keep going (the frame is still saved, and it
+        # will be claimed again if it never gets recorded)
+        try:
+            if result:
+                manifest.set_status(frame, worker_id, "done", path=result["generated_image_file"], **info)
+            else:
+                manifest.set_status(frame, worker_id, "failed", **info)
+        except OSError as e:
+            print(f"AI Render Warning: Couldn't record frame {frame} in the manifest: {e}")
+
+    # keep checking in while frames are being generated, so slow frames aren't taken over
+    # by other workers
+    stop_heartbeat = threading.Event()
+    threading.Thread(target=send_heartbeats, args=(manifest, worker_id, stop_heartbeat), daemon=True).start()
+
+    processed_frames = []
+    failed_frames = []
+    try:
+        while True:
+            frames = manifest.claim(worker_id, shard_size)
+            if not frames:
+                return processed_frames, failed_frames
+
+            print(f"AI Render: Worker {worker_id} claimed frames {frames}")
+            failed_frames += generate_frames(context, frames, modules, on_frame_complete=record_frame)
+            processed_frames += frames
+
+            # if none of the frames could even start (like when the settings are invalid),
+            # leave the rest of the frames to the other workers
+            if not started_frames.intersection(frames):
+                print(f"AI Render: Worker {worker_id} couldn't start any of its frames, so it's stopping")
+                return processed_frames, failed_frames
+    finally:
+        stop_heartbeat.set()
+
+
+def send_heartbeats(manifest, worker_id, stop_event):
+    while not stop_event.wait(heartbeat_interval):
+        try:
+            manifest.heartbeat(worker_id)
+        except OSError as e:
+            print(f"AI Render Warning: Couldn't update the manifest: {e}")
+
+
+def main(argv):
+    try:
+        args = parse_args(argv)
+    except (OSError, ValueError) as e:
+        print(f"AI Render: Invalid options: {e}")
+        return EXIT_INVALID_OPTIONS
+
+    try:
+        modules = load_addon()
+    except (RuntimeError, ImportError) as e:
+        print(f"AI Render: {e}")
+        return EXIT_INVALID_OPTIONS
+
+    context = bpy.context
+    try:
+        frames = parse_frames(args.frames, context.scene)
+    except ValueError:
+        print(f"AI Render: Invalid frame range: {args.frames}")
+        return EXIT_INVALID_OPTIONS
+
+    apply_args(args, context.scene, modules["utils"])
+
+    manifest = None
+    try:
+        if args.manifest:
+            manifest = get_manifest(args, context.scene, modules)
+            if args.frames:
+                manifest.add_frames(frames)
+            shard_size = args.shard_size or 2 * context.scene.air_props.animation_max_frames_in_flight
+            frames, failed_frames = generate_frames_from_manifest(context, manifest, args.worker_id, shard_size, modules)
+        else:
+            failed_frames = generate_frames(context, frames, modules)
+    except KeyboardInterrupt:
+        # stop the frames on the server too, and give our claimed frames back to the other workers
+        print("AI Render: Canceled")
+        modules["cancellation"].cancel().join(cancel_timeout)
+        if manifest:
+            manifest.release_worker(args.worker_id)
+        return EXIT_GENERATION_FAILED
+    if failed_frames:
+        print(f"AI Render: {len(failed_frames)} of {len(frames)} frames failed: {failed_frames}")
+        return EXIT_GENERATION_FAILED
+
+    print(f"AI Render: Generated {len(frames)} frames")
+    return EXIT_SUCCESS
+
+
+if __name__ == "__main__":
+    sys.exit(main(get_script_argv()))
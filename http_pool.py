@@ -0,0 +1,52 @@
+import requests
+import threading
+from requests.adapters import HTTPAdapter
+from . import utils
+
+
+# private
+sessions = {}
+sessions_lock = threading.Lock()
+
+
+def create_session(settings):
+    pool_size = settings.http_pool_size
+
+    # mount an adapter that keeps up to pool_size connections open per host
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    # requests keeps connections alive by default, so only opt out if asked
+    if not settings.http_keep_alive:
+        session.headers["Connection"] = "close"
+
+    return session
+
+
+# public methods
+def get_session(backend_name, props=None):
+    """Get the shared http session for a backend, so connections are reused between requests.
+    Pass a props snapshot when calling from a background thread, so a new session doesn't
+    have to read the add-on preferences"""
+    with sessions_lock:
+        if backend_name not in sessions:
+            sessions[backend_name] = create_session(props if props is not None else utils.get_addon_preferences())
+        return sessions[backend_name]
+
+
+def close_all():
+    """Close every pooled connection (sessions are recreated the next time they're needed)"""
+    with sessions_lock:
+        for session in sessions.values():
+            session.close()
+        sessions.clear()
+
+
+def close_all_handler(self, context):
+    close_all()
+
+
+def unregister():
+    close_all()
@@ -0,0 +1,140 @@
+import base64
+import json
+import os
+import re
+
+
+# read image files in chunks that are a multiple of 3 bytes, so each chunk can be
+# base64 encoded on its own (without padding in the middle of the output)
+base64_read_chunk_size = 3 * 64 * 1024
+
+
+def iter_base64(img_file):
+    """Yield the base64 encoded contents of a file, one chunk at a time, and then close it"""
+    try:
+        while True:
+            chunk = img_file.read(base64_read_chunk_size)
+            if not chunk:
+                break
+            yield base64.b64encode(chunk)
+    finally:
+        img_file.close()
+
+
+def iter_json_body(params, image_fields, data_url_prefix="data:image/png;base64,"):
+    """Yield a JSON request body made of params plus base64 encoded images. The images
+    are encoded in chunks as the request is sent, so we never hold a whole encoded
+    copy in memory. image_fields maps a field name to an open image file (sent as a
+    string) or a list of open image files (sent as a list of strings)"""
+
+    # start with the regular params, leaving off the closing brace
+    yield json.dumps(params)[:-1].encode()
+
+    separator = b", " if params else b""
+    for field_name, value in image_fields.items():
+        is_list = isinstance(value, list)
+        img_files = value if is_list else [value]
+
+        yield separator + json.dumps(field_name).encode() + b": "
+        if is_list:
+            yield b"["
+
+        for i, img_file in enumerate(img_files):
+            if i > 0:
+                yield b", "
+            yield b'"' + data_url_prefix.encode()
+            yield from iter_base64(img_file)
+            yield b'"'
+
+        if is_list:
+            yield b"]"
+        separator = b", "
+
+    yield b"}"
+
+
+
+def close_image_fields(image_fields):
+    """Close the image files of a request that won't be sent (iter_json_body closes them
+    otherwise)"""
+    for value in image_fields.values():
+        for img_file in (value if isinstance(value, list) else [value]):
+            img_file.close()
+
+
+# how much of the response to read at a time, while decoding images
+response_chunk_size = 64 * 1024
+
+
+def write_base64_field_to_file(response, field_names, output_file):
+    """Find the first string value of any of the given fields in a streamed JSON response,
+    and base64 decode it straight into output_file, one chunk at a time. A leading data
+    url prefix ("data:image/png;base64,") is skipped. Returns True if an image was written"""
+    field_pattern = re.compile(rb'"(?:' + b"|".join(re.escape(name.encode()) for name in field_names) + rb')"\s*:\s*\[?\s*"')
+    max_field_length = max(len(name) for name in field_names) + 16
+
+    state = "search"
+    buffer = b""
+    encoded = b""
+    chunks = response.iter_content(chunk_size=response_chunk_size)
+
+    with open(output_file, "wb") as file:
+        for chunk in chunks:
+            buffer += chunk
+
+            # look for the start of the field's value
+            if state == "search":
+                match = field_pattern.search(buffer)
+                if not match:
+                    buffer = buffer[-max_field_length:]
+                    continue
+                buffer = buffer[match.end():]
+                state = "prefix"
+
+            # skip the data url prefix, if there is one
+            if state == "prefix":
+                if len(buffer) < len(b"data:") and b'"' not in buffer:
+                    continue
+                if buffer.startswith(b"data:"):
+                    comma_index = buffer.find(b",")
+                    if comma_index == -1:
+                        continue
+                    buffer = buffer[comma_index + 1:]
+                state = "value"
+
+            # decode as much of the value as we have (in multiples of 4 base64 chars)
+            if state == "value":
+                end_index = buffer.find(b'"')
+                value = buffer if end_index == -1 else buffer[:end_index]
+
+                # keep a trailing backslash until we see what it escapes
+                buffer = b""
+                if end_index == -1 and value.endswith(b"\\"):
+                    buffer = b"\\"
+                    value = value[:-1]
+
+                encoded += value.replace(b"\\/", b"/")
+                decodable_length = len(encoded) if end_index != -1 else len(encoded) // 4 * 4
+                file.write(base64.b64decode(encoded[:decodable_length]))
+                encoded = encoded[decodable_length:]
+
+                if end_index != -1:
+                    state = "done"
+                    break
+
+    # read the rest of the response, so the connection can be reused
+    for chunk in chunks:
+        pass
+
+    if state != "done":
+        os.remove(output_file)
+        return False
+
+    return True
+
+
+def write_response_to_file(response, output_file):
+    """Write a streamed (binary) response to a file, one chunk at a time"""
+    with open(output_file, "wb") as file:
+        for chunk in response.iter_content(chunk_size=response_chunk_size):
+            file.write(chunk)
@@ -0,0 +1,126 @@
+import bpy
+import numpy
+import struct
+import zlib
+
+
+# images are compared at this size (it's a multiple of the 9x8 grid the hash uses)
+thumbnail_width = 72
+thumbnail_height = 64
+
+# how many of the 64 hash bits can differ for two images to count as the same
+max_hash_distance = 4
+
+temp_image_name = "AI Render Temp Buffer"
+
+
+def read_pixels(img_data):
+    """Decode encoded image bytes (png, jpg, webp, etc) into an array of RGBA pixels. Blender
+    can only decode images from a datablock, so this packs the bytes into a temporary one
+    (nothing is written to disk)"""
+    img = bpy.data.images.new(temp_image_name, width=1, height=1)
+    try:
+        img.pack(data=img_data, data_len=len(img_data))
+        img.source = 'FILE'
+        width, height = img.size
+        channels = img.channels
+        pixels = numpy.empty(width * height * channels, dtype=numpy.float32)
+        img.pixels.foreach_get(pixels)
+        pixels = pixels.reshape(height, width, channels)
+
+        # add an opaque alpha channel to RGB images
+        if channels == 3:
+            pixels = numpy.concatenate([pixels, numpy.ones((height, width, 1), dtype=numpy.float32)], axis=2)
+        return pixels
+    finally:
+        bpy.data.images.remove(img)
+
+
+def get_thumbnail(pixels):
+    # sample a grayscale thumbnail (nearest neighbor is plenty for comparing frames)
+    height, width = pixels.shape[:2]
+    rows = numpy.linspace(0, height - 1, thumbnail_height).astype(int)
+    columns = numpy.linspace(0, width - 1, thumbnail_width).astype(int)
+    grayscale = pixels[:, :, :3] @ numpy.array([0.299, 0.587, 0.114], dtype=numpy.float32)
+    return grayscale[rows][:, columns]
+
+
+def get_difference_hash(thumbnail):
+    # average the thumbnail down to 9x8, and compare each cell to its right neighbor
+    grid = thumbnail.reshape(8, thumbnail_height // 8, 9, thumbnail_width // 9).mean(axis=(1, 3))
+    return grid[:, 1:] > grid[:, :-1]
+
+
+# public methods
+def get_signature(img_data):
+    """Get a small signature of an image, for comparing it to other images"""
+    thumbnail = get_thumbnail(read_pixels(img_data))
+    return {
+        "thumbnail": thumbnail,
+        "hash": get_difference_hash(thumbnail),
+    }
+
+
+def are_signatures_similar(signature_a, signature_b, threshold):
+    """Check if two images look the same: their perceptual hashes (nearly) match, and their
+    average pixel difference (from 0 to 1) is within the threshold"""
+    if signature_a is None or signature_b is None:
+        return False
+    if signature_a["thumbnail"].shape != signature_b["thumbnail"].shape:
+        return False
+    if numpy.count_nonzero(signature_a["hash"] != signature_b["hash"]) > max_hash_distance:
+        return False
+    return float(numpy.abs(signature_a["thumbnail"] - signature_b["thumbnail"]).mean()) <= threshold
+
+
+def get_image_size(img_data):
+    """Read an image's (width, height) from its header, without decoding it (png, jpg and
+    webp). Returns None for other formats"""
+    try:
+        if img_data[:8] == b"\x89PNG\r\n\x1a\n":
+            return struct.unpack(">II", img_data[16:24])
+
+        if img_data[:2] == b"\xff\xd8":
+            # walk the jpg segments until the frame header
+            i = 2
+            while i + 9 <= len(img_data):
+                marker = img_data[i + 1]
+                if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+                    height, width = struct.unpack(">HH", img_data[i + 5:i + 9])
+                    return width, height
+                i += 2 + struct.unpack(">H", img_data[i + 2:i + 4])[0]
+            return None
+
+        if img_data[:4] == b"RIFF" and img_data[8:12] == b"WEBP":
+            chunk_type = img_data[12:16]
+            if chunk_type == b"VP8 ":
+                width, height = struct.unpack("<HH", img_data[26:30])
+                return width & 0x3fff, height & 0x3fff
+            if chunk_type == b"VP8L":
+                bits = struct.unpack("<I", img_data[21:25])[0]
+                return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+            if chunk_type == b"VP8X":
+                return int.from_bytes(img_data[24:27], "little") + 1, int.from_bytes(img_data[27:30], "little") + 1
+    except struct.error:
+        pass
+    return None
+
+
+def encode_png(pixels):
+    """Encode RGBA pixels (from 0 to 1, bottom row first, like Blender's) as png bytes"""
+    height, width = pixels.shape[:2]
+    rows = (numpy.clip(pixels[::-1, :, :4], 0, 1) * 255 + 0.5).astype(numpy.uint8).reshape(height, width * 4)
+
+    # every row starts with its filter type (0, for no filter)
+    raw_data = numpy.zeros((height, width * 4 + 1), dtype=numpy.uint8)
+    raw_data[:, 1:] = rows
+
+    def chunk(chunk_type, data):
+        return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data) & 0xffffffff)
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw_data.tobytes(), 6))
+        + chunk(b"IEND", b"")
+    )
@@ -0,0 +1,76 @@
+import bpy
+
+
+# the custom property we tag AI Render images with (its value orders them by age)
+tag_prop_name = "ai_render_loaded_order"
+
+# animation frames are loaded into this many preview images, in turn, instead of
+# creating a new image for every frame
+animation_preview_pool_size = 2
+animation_preview_name = "AI Render Animation Preview"
+
+# private
+next_preview_index = 0
+
+
+def tag_image(img):
+    # the tags are saved in the .blend file, so continue from the newest one (a counter
+    # that restarts every session would make new images look older than saved ones)
+    newest = max((other[tag_prop_name] for other in bpy.data.images if tag_prop_name in other and other != img), default=0)
+    img[tag_prop_name] = newest + 1
+
+
+def is_in_use(img):
+    return img.users > 0 or img.use_fake_user or img.is_dirty or img.packed_file is not None
+
+
+def get_next_animation_preview_name():
+    global next_preview_index
+    index = next_preview_index
+    next_preview_index = (next_preview_index + 1) % animation_preview_pool_size
+    return f"{animation_preview_name} {index + 1}"
+
+
+# public methods
+def get_pooled_images():
+    """Get every image AI Render has loaded, oldest first"""
+    images = [img for img in bpy.data.images if tag_prop_name in img]
+    return sorted(images, key=lambda img: img[tag_prop_name])
+
+
+def load_image(filename, data_block_name, is_animation_frame=False):
+    """Load a generated image into a datablock. Animation frames reuse a small, fixed set
+    of preview datablocks, so long animations don't pile up images in memory"""
+    if is_animation_frame:
+        data_block_name = get_next_animation_preview_name()
+
+    # the backends decode the response straight into this file as it downloads (the
+    # image is never held in memory), so loading the file is the only read it needs
+    if data_block_name in bpy.data.images:
+        img = bpy.data.images[data_block_name]
+        img.filepath = filename
+    else:
+        img = bpy.data.images.load(filename, check_existing=False)
+        img.name = data_block_name
+
+    tag_image(img)
+    return img
+
+
+def purge(max_images, keep=None):
+    """Remove the oldest AI Render images beyond max_images (but never images that are
+    in use, like ones shown in an image editor, saved with a fake user, or edited)"""
+    images = get_pooled_images()
+    for img in images[:max(0, len(images) - max_images)]:
+        if img != keep and not is_in_use(img):
+            bpy.data.images.remove(img)
+
+
+def get_memory_usage():
+    """Get roughly how many bytes of pixel data the loaded AI Render images are holding"""
+    total = 0
+    for img in get_pooled_images():
+        if img.has_data:
+            bytes_per_channel = 4 if img.is_float else 1
+            total += img.size[0] * img.size[1] * img.channels * bytes_per_channel
+    return total
@@ -0,0 +1,196 @@
+"""A JSON manifest that tracks the status of every frame of a batch render, so several
+Blender processes (on one machine or many, with a shared folder) can split up the frames.
+This doesn't use Blender at all, so the coordinator can use it from plain Python."""
+
+import hashlib
+import json
+import os
+import time
+import uuid
+
+
+manifest_filename = "ai-render-manifest.json"
+
+# a worker that hasn't checked in for this long is treated as dead, and its frames are
+# given to other workers (in seconds)
+default_worker_timeout = 600
+
+# a lock file older than this was left behind by a crashed process (in seconds)
+stale_lock_age = 30
+
+
+class ManifestLock:
+    """An exclusive lock file next to the manifest (this works across processes and
+    machines that share the folder)"""
+
+    def __init__(self, path):
+        self.lock_file = path + ".lock"
+        self.token = uuid.uuid4().hex
+
+    def __enter__(self):
+        while True:
+            try:
+                fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, self.token.encode())
+                os.close(fd)
+                return self
+            except FileExistsError:
+                if not self.remove_stale_lock():
+                    time.sleep(0.05)
+
+    def __exit__(self, *args):
+        # only remove the lock if it's still ours (if we took so long that it was treated
+        # as stale, another process may hold it now)
+        try:
+            with open(self.lock_file, "r") as file:
+                if file.read() == self.token:
+                    os.remove(self.lock_file)
+        except OSError:
+            pass
+
+    def remove_stale_lock(self):
+        """Remove the lock file if it was left behind by a crashed process. It's moved aside
+        before being checked again, so a fresh lock another process just took is never
+        deleted. Returns True if a stale lock was removed"""
+        try:
+            if time.time() - os.path.getmtime(self.lock_file) <= stale_lock_age:
+                return False
+            stale_file = f"{self.lock_file}.{self.token}.stale"
+            os.replace(self.lock_file, stale_file)
+        except OSError:
+            return False
+
+        # if the lock was replaced by a fresh one before we moved it, put it back
+        try:
+            if time.time() - os.path.getmtime(stale_file) > stale_lock_age:
+                os.remove(stale_file)
+                return True
+            os.link(stale_file, self.lock_file)
+        except OSError:
+            pass
+        try:
+            os.remove(stale_file)
+        except OSError:
+            pass
+        return False
+
+
+class Manifest:
+    """The status of every frame ("pending", "claimed", "done" or "failed"), and when each
+    worker last checked in. Every change is read, made and written under the lock"""
+
+    def __init__(self, path, worker_timeout=default_worker_timeout):
+        self.path = path
+        self.worker_timeout = worker_timeout
+
+    def load(self):
+        try:
+            with open(self.path, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {"frames": {}, "workers": {}}
+
+    def save(self, data):
+        # write to a temp file and then swap it in, so readers never see half a manifest
+        with open(self.path + ".tmp", "w") as file:
+            json.dump(data, file, indent=1)
+        os.replace(self.path + ".tmp", self.path)
+
+    def update(self, function):
+        with ManifestLock(self.path):
+            data = self.load()
+            result = function(data)
+            self.save(data)
+            return result
+
+    def is_worker_alive(self, data, worker_id):
+        worker = data["workers"].get(worker_id)
+        return worker is not None and time.time() - worker["heartbeat"] < self.worker_timeout
+
+    def add_frames(self, frames):
+        """Add frames to the manifest as pending (frames it already has are left alone)"""
+        def add(data):
+            for frame in frames:
+                data["frames"].setdefault(str(frame), {"status": "pending"})
+        self.update(add)
+
+    def claim(self, worker_id, count):
+        """Claim up to count frames for a worker, lowest frames first. Frames claimed by
+        dead workers are taken over. Returns the claimed frames"""
+        def claim(data):
+            data["workers"][worker_id] = {"heartbeat": time.time()}
+            claimed = []
+            for frame in sorted(data["frames"], key=int):
+                if len(claimed) >= count:
+                    break
+                entry = data["frames"][frame]
+                if entry["status"] == "pending" or (
+                    entry["status"] == "claimed" and not self.is_worker_alive(data, entry["worker"])
+                ):
+                    data["frames"][frame] = {"status": "claimed", "worker": worker_id, "claimed_at": time.time()}
+                    claimed.append(int(frame))
+            return claimed
+        return self.update(claim)
+
+    def set_status(self, frame, worker_id, status, **info):
+        """Mark a frame as "done" or "failed", with any extra info about it"""
+        def set_status(data):
+            data["workers"][worker_id] = {"heartbeat": time.time()}
+            data["frames"][str(frame)] = {"status": status, "worker": worker_id, "finished_at": time.time(), **info}
+        self.update(set_status)
+
+    def heartbeat(self, worker_id):
+        def heartbeat(data):
+            data["workers"][worker_id] = {"heartbeat": time.time()}
+        self.update(heartbeat)
+
+    def release_worker(self, worker_id):
+        """Give a (dead) worker's claimed frames back to the other workers"""
+        def release(data):
+            data["workers"].pop(worker_id, None)
+            for frame, entry in data["frames"].items():
+                if entry["status"] == "claimed" and entry["worker"] == worker_id:
+                    data["frames"][frame] = {"status": "pending"}
+        self.update(release)
+
+    def retry_failed(self):
+        """Put every failed frame back to pending"""
+        def retry(data):
+            for frame, entry in data["frames"].items():
+                if entry["status"] == "failed":
+                    data["frames"][frame] = {"status": "pending"}
+        self.update(retry)
+
+    def get_frames(self):
+        """Get a snapshot of every frame's entry, keyed by frame number"""
+        return {int(frame): entry for frame, entry in self.load()["frames"].items()}
+
+    def get_counts(self):
+        counts = {"pending": 0, "claimed": 0, "done": 0, "failed": 0}
+        for entry in self.get_frames().values():
+            counts[entry["status"]] += 1
+        return counts
+
+
+def get_manifest_file(output_path):
+    return os.path.join(output_path, manifest_filename)
+
+
+def get_prompt_hash(prompt, negative_prompt):
+    return hashlib.sha256(json.dumps([prompt, negative_prompt]).encode()).hexdigest()[:16]
+
+
+def is_frame_complete(entry, prompt_hash, seed=None):
+    """Check that a frame is done with the same prompts (and seed, if given), and that
+    its output file still exists"""
+    if not entry or entry.get("status") != "done":
+        return False
+    if entry.get("prompt_hash") != prompt_hash:
+        return False
+    if seed is not None and entry.get("seed") != seed:
+        return False
+
+    try:
+        return os.path.getsize(entry["path"]) > 0
+    except (KeyError, OSError):
+        return False
@@ -1,16 +1,32 @@
 import bpy
+import collections
+import concurrent.futures
 import functools
+import io
 import math
+import os
 import random
-import re
+import threading
 import time
+import types
 
 from . import (
     analytics,
+    animated_prompts,
+    backend_metadata,
+    cancellation,
     config,
+    image_buffers,
+    image_pool,
+    manifest,
     progress_bar,
+    result_cache,
+    scene_fingerprint,
     task_queue,
+    temp_files,
+    tiling,
     utils,
+    worker,
 )
 
 from .sd_backends import automatic1111_api
@@ -30,6 +46,9 @@ def enable_air(scene):
     # an error from a past render)
     clear_error(scene)
 
+    # load the server's lists of models, etc (in the background)
+    backend_metadata.refresh()
+
 
 def mute_legacy_compositor_node_group(scene):
     if scene.node_tree and scene.node_tree.nodes:
@@ -49,8 +68,14 @@ def set_image_dimensions(context, width, height):
 def handle_error(msg, error_key = ''):
     """Show an error popup, and set the error message to be displayed in the ui"""
     print("AI Render Error:", msg)
+
+    # don't show errors from work that was canceled (it usually fails because of the cancel)
+    if cancellation.is_canceling_work() and threading.current_thread() is not threading.main_thread():
+        return False
+
+    # (analytics reads the preferences, so it's tracked from the main thread too)
     task_queue.add(functools.partial(bpy.ops.ai_render.show_error_popup, 'INVOKE_DEFAULT', error_message=msg, error_key=error_key))
-    analytics.track_event('ai_render_error', value=error_key)
+    task_queue.add(functools.partial(analytics.track_event, 'ai_render_error', value=error_key))
     return False
 
 
@@ -77,6 +102,15 @@ def generate_new_random_seed(scene):
         props.seed = random.randint(1000000000, 2147483647)
 
 
+def get_animation_frame_seeds(scene, frames):
+    """Choose the seed for every frame of an animation up front"""
+    props = scene.air_props
+    if props.use_random_seed:
+        return {frame: random.randint(1000000000, 2147483647) for frame in frames}
+    else:
+        return {frame: props.seed for frame in frames}
+
+
 def ensure_animated_prompts_text():
     text = utils.get_animated_prompt_text_data_block()
     if text:
@@ -117,16 +151,34 @@ def ensure_animated_prompts_text_editor(context):
     script_area.spaces[0].text = utils.get_animated_prompt_text_data_block()
 
 
-def render_frame(context, current_frame, prompts):
-    """Render the current frame as part of an animation"""
+def render_frame(context, current_frame, prompts, seed=None):
+    """Render the current frame as part of an animation, and prepare the job to send it to the API"""
     # set the frame
     context.scene.frame_set(current_frame)
 
-    # render the frame
-    bpy.ops.render.render()
+    # render the frame, unless nothing that affects the render has changed since the
+    # last render we captured (then we can reuse that one)
+    fingerprint = get_render_fingerprint(context)
+    img_data = scene_fingerprint.get_cached_render(fingerprint)
+    if img_data is None:
+        bpy.ops.render.render()
+    else:
+        print(f"AI Render: Frame {current_frame} is unchanged, reusing the last render")
+
+    # capture the render and everything else we need to post to the api
+    return prepare_generate_job(context.scene, prompts, seed=seed, img_data=img_data, fingerprint=fingerprint)
 
-    # post to the api
-    return sd_generate(context.scene, prompts)
+
+def get_render_fingerprint(context):
+    """Fingerprint everything that affects the render, if we're skipping unchanged renders"""
+    if not context.scene.air_props.do_skip_unchanged_renders:
+        return None
+
+    try:
+        return scene_fingerprint.get_fingerprint(context, utils.get_image_format())
+    except Exception as e:
+        print(f"AI Render Warning: Couldn't fingerprint the scene: {e}")
+        return None
 
 
 def save_render_to_file(scene, filename_prefix):
@@ -155,51 +207,96 @@ def save_render_to_file(scene, filename_prefix):
     return temp_file
 
 
-def save_before_image(scene, filename_prefix):
+def capture_render_result(scene, filename_prefix):
+    """Capture the Render Result as encoded image bytes (in the backend's upload format).
+    Blender doesn't expose the Render Result's pixels to Python, so this saves it once
+    and keeps the bytes in memory, for both the upload and the 'before' image"""
+    temp_file = save_render_to_file(scene, filename_prefix)
+    if not temp_file:
+        return False
+
+    try:
+        with open(temp_file, 'rb') as file:
+            img_data = file.read()
+        os.remove(temp_file)
+    except:
+        return handle_error("Couldn't read rendered image", "save_render")
+
+    return img_data
+
+
+def is_render_output_format_same_as_upload_format(scene):
+    image_settings = scene.render.image_settings
+    return (
+        image_settings.file_format == utils.get_image_format(to_lower=False)
+        and image_settings.color_mode == 'RGBA'
+        and image_settings.color_depth == '8'
+    )
+
+
+def save_before_image(scene, filename_prefix, img_data=None):
     ext = utils.get_extension_from_file_format(scene.render.image_settings.file_format)
     if ext:
         ext = f".{ext}"
     filename = f"{filename_prefix}{ext}"
     full_path_and_filename = utils.get_absolute_path_for_output_file(scene.air_props.autosave_image_path, filename)
     try:
-        bpy.data.images['Render Result'].save_render(bpy.path.abspath(full_path_and_filename))
+        # if we already captured the render in the same format, just write those bytes
+        if img_data and is_render_output_format_same_as_upload_format(scene):
+            with open(full_path_and_filename, 'wb') as file:
+                file.write(img_data)
+        else:
+            bpy.data.images['Render Result'].save_render(bpy.path.abspath(full_path_and_filename))
     except:
         return handle_error(f"Couldn't save 'before' image to {bpy.path.abspath(full_path_and_filename)}", "save_image")
 
 
-def save_after_image(scene, filename_prefix, img_file):
-    filename = f"{filename_prefix}.{utils.get_image_format()}"
-    full_path_and_filename = utils.get_absolute_path_for_output_file(scene.air_props.autosave_image_path, filename)
+def open_image_data(img_data, filename):
+    """Wrap captured image bytes in a file-like object, to pass to the backends"""
+    img_file = io.BytesIO(img_data)
+    img_file.name = filename
+    return img_file
+
+
+def save_image_to_path(absolute_path, filename, img_file, description="image", move=False):
+    """Copy (or move) an image file into an (already absolute) output path. This doesn't
+    touch any Blender data, so it's safe to call from a background thread"""
+    full_path_and_filename = os.path.join(absolute_path, filename)
     try:
-        utils.copy_file(img_file, full_path_and_filename)
+        if move:
+            utils.move_file(img_file, full_path_and_filename)
+        else:
+            utils.copy_file(img_file, full_path_and_filename)
         return full_path_and_filename
     except:
-        return handle_error(f"Couldn't save 'after' image to {bpy.path.abspath(full_path_and_filename)}", "save_image")
+        return handle_error(f"Couldn't save {description} to {full_path_and_filename}", "save_image")
+
+
+def save_after_image(scene, filename_prefix, img_file):
+    filename = f"{filename_prefix}.{utils.get_image_format()}"
+    absolute_path = utils.get_absolute_path_for_output_file(scene.air_props.autosave_image_path, "")
+    return save_image_to_path(absolute_path, filename, img_file, "'after' image", move=True)
 
 
 def save_animation_image(scene, filename_prefix, img_file):
     filename = f"{filename_prefix}{str(scene.frame_current).zfill(4)}.{utils.get_image_format()}"
-    full_path_and_filename = utils.get_absolute_path_for_output_file(scene.air_props.animation_output_path, filename)
-    try:
-        utils.copy_file(img_file, full_path_and_filename)
-        return full_path_and_filename
-    except:
-        return handle_error(f"Couldn't save animation image to {bpy.path.abspath(full_path_and_filename)}", "save_image")
+    absolute_path = utils.get_absolute_path_for_output_file(scene.air_props.animation_output_path, "")
+    return save_image_to_path(absolute_path, filename, img_file, "animation image")
 
 
-def load_image(filename, data_block_name=None):
+def load_image(filename, data_block_name=None, is_animation_frame=False):
     name = filename
     if data_block_name:
         name = data_block_name
 
-    if name in bpy.data.images:
-        existing_img = bpy.data.images[name]
-        existing_img.filepath = filename
-        return existing_img
+    img = image_pool.load_image(filename, name, is_animation_frame)
 
-    img_file = bpy.data.images.load(filename, check_existing=False)
-    img_file.name = name
-    return img_file
+    # remove old AI Render images, if we're only keeping a certain number of them
+    preferences = utils.get_addon_preferences()
+    if preferences.do_purge_old_images:
+        image_pool.purge(preferences.max_kept_images, keep=img)
+
+    return img
 
 def do_pre_render_setup(scene):
     # Lock the user interface when rendering, so that we can change
@@ -215,18 +312,21 @@ def do_pre_render_setup(scene):
 
 
 def do_pre_api_setup(scene):
-    # TODO: does nothing at the moment
-    pass
+    # start showing errors again, if previous work was canceled
+    cancellation.begin()
 
 
-def validate_params(scene, prompt=None):
+def validate_params(scene, prompt=None, can_tile=False):
     if utils.get_dream_studio_api_key().strip() == "" and utils.sd_backend() == "dreamstudio":
         return handle_error("You must enter an API Key to render with DreamStudio", "api_key")
     if not utils.are_dimensions_valid(scene):
         return handle_error("Please set width and height to valid values", "invalid_dimensions")
     if utils.are_dimensions_too_small(scene):
         return handle_error("Image dimensions are too small. Please increase width and/or height", "dimensions_too_small")
-    if utils.are_dimensions_too_large(scene):
+    # (only generating can split large images into tiles, not inpainting or outpainting)
+    if utils.are_dimensions_too_large(scene) and not (can_tile and scene.air_props.use_tiled_generation):
+        if can_tile:
+            return handle_error("Image dimensions are too large. Please decrease width and/or height, or turn on tiled generation", "dimensions_too_large")
         return handle_error("Image dimensions are too large. Please decrease width and/or height", "dimensions_too_large")
     if prompt == "":
         return handle_error("Please enter a prompt for Stable Diffusion", "prompt")
@@ -257,63 +357,24 @@ def get_full_prompt(scene, prompt=None):
 
 
 def get_prompt_at_frame(animated_prompts, frame):
-    for line in reversed(animated_prompts):
-        if line['start_frame'] <= frame:
-            return line['prompt']
-    return ""
+    return animated_prompts.get_prompt_at_frame(frame)
 
 
 def validate_and_process_animated_prompt_text(scene):
     text_data = utils.get_animated_prompt_text_data_block()
     if text_data is None:
-        return handle_error("Animated prompt text does not exist. Please edit animated prompts.", "animated_prompt_text_data_block")
-
-    lines = text_data.as_string().splitlines()
-    lines = [line.strip() for line in lines]
-
-    # find "Negative:" in lines, if it exists
-    negative_index = -1
-    for i, line in enumerate(lines):
-        if line.lower() == "negative:":
-            negative_index = i
-            break
-
-    if negative_index > -1:
-        positive_lines = lines[:negative_index]
-        negative_lines = lines[negative_index+1:]
-    else:
-        positive_lines = lines
-        negative_lines = []
-
-    def parse_lines(lines, is_positive=True):
-        r = re.compile('^(\d+):(.*)')
-        lines = list(filter(r.match, lines))
-
-        processed_lines = []
-        for line in lines:
-            m = r.match(line)
-            if m:
-                start_frame = int(m.group(1))
-                prompt = m.group(2).strip()
-                processed_lines.append({
-                    'start_frame': start_frame,
-                    'prompt': get_full_prompt(scene, prompt=prompt) if is_positive else prompt,
-                })
+        return handle_error("Animated prompt text does not exist. Please edit animated prompts.", "animated_prompt_text_data_block"), []
 
-        if is_positive:
-            processed_lines = list(filter(lambda x: x['prompt'] != "", processed_lines))
-
-        if len(processed_lines) == 0 and is_positive:
-            return handle_error(f"Animated Prompt text is empty or invalid. [Get help with animated prompts]({config.HELP_WITH_ANIMATED_PROMPTS_URL})", "animated_prompt_text")
-
-        if len(processed_lines) > 0:
-            processed_lines.sort(key=lambda x: x['start_frame'])
-            processed_lines[0]['start_frame'] = 1 # ensure the first frame is 1
-
-        return processed_lines
+    # parse the text into timelines (this is cached until the text or preset changes)
+    props = scene.air_props
+    positive_lines, negative_lines = animated_prompts.get_timelines(
+        text_data.as_string(),
+        lambda prompt: get_full_prompt(scene, prompt=prompt),
+        (props.use_preset, props.preset_style),
+    )
 
-    positive_lines = parse_lines(positive_lines)
-    negative_lines = parse_lines(negative_lines, is_positive=False)
+    if len(positive_lines) == 0:
+        return handle_error(f"Animated Prompt text is empty or invalid. [Get help with animated prompts]({config.HELP_WITH_ANIMATED_PROMPTS_URL})", "animated_prompt_text"), []
 
     return positive_lines, negative_lines
 
@@ -328,6 +389,21 @@ def validate_and_process_animated_prompt_text_for_single_frame(scene, frame):
 
 def sd_generate(scene, prompts=None, use_last_sd_image=False):
     """Post to the API to generate a Stable Diffusion image and then process it"""
+
+    # gather everything we need from the scene, while we're still in the main thread
+    job = prepare_generate_job(scene, prompts, use_last_sd_image)
+    if not job:
+        return False
+
+    # run the network and file i/o on a background worker, and then finish up
+    # back in the main thread
+    worker.add_done_callback(submit_generate_job(job), functools.partial(finish_generate_job, scene, job))
+    return True
+
+
+def prepare_generate_job(scene, prompts=None, use_last_sd_image=False, seed=None, img_data=None, fingerprint=None):
+    """Validate and snapshot everything needed to generate an image (must run in the main thread).
+    img_data can be a previously captured render to use, instead of the Render Result"""
     props = scene.air_props
 
     # get the prompt if we haven't been given one
@@ -344,11 +420,14 @@ def sd_generate(scene, prompts=None, use_last_sd_image=False):
         negative_prompt = prompts["negative_prompt"]
 
     # validate the parameters we will send
-    if not validate_params(scene, prompt):
+    if not validate_params(scene, prompt, can_tile=True):
         return False
 
-    # generate a new seed, if we want a random one
-    generate_new_random_seed(scene)
+    # use the seed we were given, or generate a new seed, if we want a random one
+    if seed is not None:
+        props.seed = seed
+    else:
+        generate_new_random_seed(scene)
 
     # prepare the output filenames
     before_output_filename_prefix = utils.get_image_filename(scene, prompt, negative_prompt, "-1-before")
@@ -360,17 +439,22 @@ def sd_generate(scene, prompts=None, use_last_sd_image=False):
         if not props.last_generated_image_filename:
             return handle_error("Couldn't find the last Stable Diffusion image", "last_generated_image_filename")
         try:
-            img_file = open(props.last_generated_image_filename, 'rb')
+            with open(props.last_generated_image_filename, 'rb') as file:
+                img_data = file.read()
         except:
             return handle_error("Couldn't load the last Stable Diffusion image. It's probably been deleted or moved. You'll need to restore it or render a new image.", "load_last_generated_image")
-    else:
+    elif img_data is None:
         # else, use the rendered image...
 
-        # save the rendered image and then read it back in
-        temp_input_file = save_render_to_file(scene, before_output_filename_prefix)
-        if not temp_input_file:
+        # capture the rendered image into memory
+        img_data = capture_render_result(scene, before_output_filename_prefix)
+        if not img_data:
             return False
-        img_file = open(temp_input_file, 'rb')
+
+        # remember this animation frame's render, so it can be reused while the scene is
+        # unchanged (only animation frames are fingerprinted, since each run starts over)
+        if fingerprint is not None:
+            scene_fingerprint.store_render(fingerprint, img_data)
 
         # autosave the before image, if we want that, and we're not rendering an animation
         if (
@@ -379,7 +463,7 @@ def sd_generate(scene, prompts=None, use_last_sd_image=False):
             and not props.is_rendering_animation
             and not props.is_rendering_animation_manually
         ):
-            save_before_image(scene, before_output_filename_prefix)
+            save_before_image(scene, before_output_filename_prefix, img_data)
 
     # prepare data for the API request
     params = {
@@ -394,58 +478,373 @@ def sd_generate(scene, prompts=None, use_last_sd_image=False):
         "sampler": props.sampler,
     }
 
-    # get the backend we're using
+    # resolve the output paths now, because they depend on the blend file location
+    autosave_image_path = ""
+    if utils.should_autosave_after_image(props):
+        autosave_image_path = utils.get_absolute_path_for_output_file(props.autosave_image_path, "")
+
+    animation_output_path = ""
+    if props.is_rendering_animation_manually:
+        animation_output_path = utils.get_absolute_path_for_output_file(props.animation_output_path, "")
+
+    # key the result cache on everything that determines the generated image
+    props_snapshot = utils.snapshot_props(scene)
+    result_cache_key = get_result_cache_key(img_data, params, props_snapshot)
+    result_cache_max_size = utils.get_addon_preferences().result_cache_max_size * 1024 * 1024
+
+    # if the image is too large for the backend, split it into tiles to generate separately
+    tiles = None
+    if props.use_tiled_generation and utils.are_dimensions_too_large(scene):
+        tiles = prepare_tiles(img_data, params, props_snapshot)
+        if not tiles:
+            return False
+
+    # decide whether to upscale now, because the upscaler model list is in the scene
     sd_backend = utils.get_active_backend()
+    do_upscale = props.do_upscale_automatically and sd_backend.supports_upscaling() and sd_backend.is_upscaler_model_list_loaded(bpy.context)
+
+    return {
+        "params": params,
+        "props": props_snapshot,
+        "sd_backend": sd_backend,
+        "backend_name": utils.sd_backend(),
+        "img_data": img_data,
+        "img_filename": f"{before_output_filename_prefix}.{utils.get_image_format()}",
+        "frame": scene.frame_current,
+        "after_output_filename_prefix": after_output_filename_prefix,
+        "animation_output_filename_prefix": animation_output_filename_prefix,
+        "autosave_image_path": autosave_image_path,
+        "animation_output_path": animation_output_path,
+        "is_animation_frame": bool(prompts),
+        "result_cache_key": result_cache_key,
+        "result_cache_max_size": result_cache_max_size,
+        "tiles": tiles,
+        "do_upscale": do_upscale,
+        "generation": cancellation.get_generation(),
+        "start_time": time.time(),
+    }
 
-    # send to whichever API we're using
-    start_time = time.time()
-    generated_image_file = sd_backend.generate(params, img_file, after_output_filename_prefix, props)
 
-    # if we didn't get a successful image, stop here (an error will have been handled by the api function)
+def get_result_cache_key(img_data, params, props_snapshot):
+    """Get the result cache key for an image, or None if we're not using the cache"""
+    if not utils.get_addon_preferences().use_result_cache:
+        return None
+
+    server_urls = []
+    if utils.sd_backend() == "automatic1111":
+        server_urls = utils.local_sd_urls()
+    elif utils.sd_backend() == "shark":
+        server_urls = [utils.local_sd_url()]
+    return result_cache.get_cache_key(img_data, params, utils.sd_backend(), props_snapshot, server_urls)
+
+
+def prepare_tiles(img_data, params, props_snapshot):
+    """Split an image into overlapping tiles that are each small enough for the backend
+    (must run in the main thread, to decode the image). Returns a list of tiles, or False"""
+    width, height = params["width"], params["height"]
+    try:
+        pixels = tiling.resize(image_buffers.read_pixels(img_data), width, height)
+    except Exception as e:
+        return handle_error(f"Couldn't split the image into tiles: {e}", "prepare_tiles")
+
+    tiles = []
+    for rect in tiling.get_tiles(width, height, utils.get_active_backend().max_image_size(), props_snapshot.tile_overlap):
+        tile_img_data = image_buffers.encode_png(tiling.crop(pixels, rect))
+        tile_params = {**params, "width": rect[2], "height": rect[3]}
+        tiles.append({
+            "rect": rect,
+            "params": tile_params,
+            "img_data": tile_img_data,
+            "result_cache_key": get_result_cache_key(tile_img_data, tile_params, props_snapshot),
+        })
+
+    print(f"AI Render: Splitting the {width}x{height} image into {len(tiles)} tiles")
+    return tiles
+
+
+def get_cached_result(job):
+    """Copy a cached image for this job into a temp file, and return the filename (or None)"""
+    if not job["result_cache_key"]:
+        return None
+
+    try:
+        output_file = utils.create_temp_file(job["after_output_filename_prefix"] + "-", suffix=f".{job['sd_backend'].get_image_format().lower()}")
+        if result_cache.get(job["result_cache_key"], output_file):
+            print(f"Using cached image for {job['after_output_filename_prefix']}")
+            return output_file
+    except OSError as e:
+        print(f"AI Render Warning: Couldn't read from the result cache: {e}")
+    return None
+
+
+def store_result_in_cache(job, img_file):
+    if not job["result_cache_key"]:
+        return
+
+    try:
+        result_cache.store(job["result_cache_key"], img_file, job["result_cache_max_size"])
+    except OSError as e:
+        print(f"AI Render Warning: Couldn't save to the result cache: {e}")
+
+
+def generate_image(job):
+    """Generate an image (using a cached one, if we've generated this exact image before).
+    Returns the temp filename, or False"""
+    if cancellation.is_cancelled(job["generation"]):
+        return False
+
+    generated_image_file = get_cached_result(job)
     if not generated_image_file:
+        # (the backends add their own params, so give them a copy, to keep the job's params
+        # comparable with other frames)
+        generated_image_file = job["sd_backend"].generate(dict(job["params"]), open_image_data(job["img_data"], job["img_filename"]), job["after_output_filename_prefix"], job["props"])
+
+        # if we didn't get a successful image, stop here (an error will have been handled by the api function)
+        if not generated_image_file:
+            return False
+
+        # if it was canceled while generating, the image may be unfinished, so don't keep it
+        if cancellation.is_cancelled(job["generation"]):
+            os.remove(generated_image_file)
+            return False
+
+        store_result_in_cache(job, generated_image_file)
+
+    return generated_image_file
+
+
+def run_tile_jobs(job):
+    """Generate every tile of a tiled job, a few at a time (this can run on a background
+    thread). Returns the list of tile filenames, or False"""
+    tile_jobs = [
+        {
+            **job,
+            "params": tile["params"],
+            "img_data": tile["img_data"],
+            "img_filename": f"{job['after_output_filename_prefix']}-tile{i + 1}.png",
+            "after_output_filename_prefix": f"{job['after_output_filename_prefix']}-tile{i + 1}",
+            "result_cache_key": tile["result_cache_key"],
+            "tiles": None,
+        }
+        for i, tile in enumerate(job["tiles"])
+    ]
+
+    max_workers = min(len(tile_jobs), job["props"].tile_max_concurrent)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-render-tile") as executor:
+        tile_files = list(executor.map(generate_image, tile_jobs))
+
+    if not all(tile_files):
+        for tile_file in tile_files:
+            if tile_file:
+                os.remove(tile_file)
         return False
 
+    return tile_files
+
+
+def blend_tiles(job, tile_files):
+    """Blend generated tiles back into one image, saved to a temp png file (must run in the
+    main thread, to decode the tiles). Returns the filename, or False"""
+    if not tile_files:
+        return False
+
+    try:
+        tile_pixels = []
+        for tile_file in tile_files:
+            with open(tile_file, 'rb') as file:
+                tile_pixels.append(image_buffers.read_pixels(file.read()))
+            os.remove(tile_file)
+
+        rects = [tile["rect"] for tile in job["tiles"]]
+        pixels = tiling.blend(rects, tile_pixels, job["params"]["width"], job["params"]["height"], job["props"].tile_overlap)
+
+        output_file = utils.create_temp_file(job["after_output_filename_prefix"] + "-", suffix=".png")
+        with open(output_file, 'wb') as file:
+            file.write(image_buffers.encode_png(pixels))
+        return output_file
+    except Exception as e:
+        return handle_error(f"Couldn't blend the tiles together: {e}", "blend_tiles")
+
+
+def submit_generate_job(job):
+    """Run a generate job on the background workers, and return a future for its result.
+    Tiled jobs generate their tiles on the workers, blend them in the main thread (where
+    Blender can decode them), and then finish up on the workers again"""
+    if not job["tiles"]:
+        return worker.submit(functools.partial(run_generate_job, job))
+
+    future = concurrent.futures.Future()
+
+    def blend_and_process(tile_files):
+        if not future.set_running_or_notify_cancel():
+            return
+        generated_image_file = blend_tiles(job, tile_files)
+        if not generated_image_file:
+            future.set_result(False)
+            return
+        worker.submit(functools.partial(process_generated_image, job, generated_image_file), future.set_result)
+
+    worker.submit(functools.partial(run_tile_jobs, job), blend_and_process)
+    return future
+
+
+def run_generate_job(job):
+    """Generate (and optionally upscale) an image. This doesn't touch any Blender data, so
+    it can run on a background thread. Tiled jobs need their tiles blended in the main
+    thread, so use submit_generate_job for those. Returns a dict with the resulting
+    filenames, or False"""
+    generated_image_file = generate_image(job)
+    if not generated_image_file:
+        return False
+
+    return process_generated_image(job, generated_image_file)
+
+
+def process_generated_image(job, generated_image_file):
+    """Autosave, upscale and save the animation frame for a generated image (this can run
+    on a background thread)"""
+    props = job["props"]
+    sd_backend = job["sd_backend"]
+    after_output_filename_prefix = job["after_output_filename_prefix"]
+
+    # stop here if it was canceled
+    if cancellation.is_cancelled(job["generation"]):
+        os.remove(generated_image_file)
+        return False
+    result = {
+        "last_generated_image_filename": None,
+        "generated_image_file": None,
+        "data_block_name": after_output_filename_prefix,
+    }
+
+    # blended tiles are always png
+    image_format = "png" if job["tiles"] else sd_backend.get_image_format().lower()
+
     # autosave the after image, if we should
-    if utils.should_autosave_after_image(props):
-        generated_image_file = save_after_image(scene, after_output_filename_prefix, generated_image_file)
+    if job["autosave_image_path"]:
+        generated_image_file = save_image_to_path(job["autosave_image_path"], f"{after_output_filename_prefix}.{image_format}", generated_image_file, "'after' image", move=True)
 
         if not generated_image_file:
             return False
 
     # store this image filename as the last generated image
-    props.last_generated_image_filename = generated_image_file
+    result["last_generated_image_filename"] = generated_image_file
 
     # if we want to automatically upscale (and the backend supports it), do it now
-    if props.do_upscale_automatically and sd_backend.supports_upscaling() and sd_backend.is_upscaler_model_list_loaded():
+    if job["do_upscale"]:
         after_output_filename_prefix = after_output_filename_prefix + "-upscaled"
+        result["data_block_name"] = after_output_filename_prefix
 
         opened_image_file = open(generated_image_file, 'rb')
         generated_image_file = sd_backend.upscale(opened_image_file, after_output_filename_prefix, props)
+        image_format = sd_backend.get_image_format().lower()
 
         # if the upscale failed, stop here (an error will have been handled by the api function)
         if not generated_image_file:
-            return False
+            return result
 
         # autosave the upscaled after image, if we should
-        if utils.should_autosave_after_image(props):
-            generated_image_file = save_after_image(scene, after_output_filename_prefix, generated_image_file)
+        if job["autosave_image_path"]:
+            generated_image_file = save_image_to_path(job["autosave_image_path"], f"{after_output_filename_prefix}.{image_format}", generated_image_file, "'after' image", move=True)
 
             if not generated_image_file:
-                return False
+                return result
 
-    # if we're rendering an animation manually, save the image to the animation output path
-    if props.is_rendering_animation_manually:
-        generated_image_file = save_animation_image(scene, animation_output_filename_prefix, generated_image_file)
+    # if we're rendering an animation manually, move the image to the animation output path
+    # (the temp file isn't needed anymore, so there's no need to copy it)
+    if job["animation_output_path"]:
+        temp_image_file = generated_image_file
+        generated_image_file = save_image_to_path(job["animation_output_path"], get_animation_frame_filename(job, image_format), temp_image_file, "animation image", move=True)
+
+        if not generated_image_file:
+            return result
+
+        if result["last_generated_image_filename"] == temp_image_file:
+            result["last_generated_image_filename"] = generated_image_file
+
+    result["generated_image_file"] = generated_image_file
+    return result
+
+
+def get_animation_frame_filename(job, image_format):
+    return f"{job['animation_output_filename_prefix']}{str(job['frame']).zfill(4)}.{image_format}"
+
+
+def mark_duplicate_frame(scene, job, previous_job):
+    """Mark an animation frame as a duplicate if its render looks the same as the previous
+    frame's, and it has the same prompt, seed and other params (must run in the main thread)"""
+    props = scene.air_props
+    if not props.do_skip_duplicate_frames or job["tiles"]:
+        return
+
+    try:
+        job["signature"] = image_buffers.get_signature(job["img_data"])
+    except Exception as e:
+        print(f"AI Render Warning: Couldn't compare frame {job['frame']} to the previous frame: {e}")
+        return
+
+    job["is_duplicate_frame"] = (
+        previous_job is not None
+        and job["params"] == previous_job["params"]
+        and image_buffers.are_signatures_similar(job["signature"], previous_job.get("signature"), props.duplicate_frame_threshold)
+    )
+
+
+def submit_frame_job(job, previous_future):
+    """Send an animation frame to a background worker. Duplicate frames reuse the previous
+    frame's image (once it's done), instead of sending another request"""
+    if job.get("is_duplicate_frame") and previous_future is not None:
+        return worker.submit(functools.partial(run_duplicate_frame_job, job, previous_future))
+    return submit_generate_job(job)
 
+
+def run_duplicate_frame_job(job, previous_future):
+    """Save the previous frame's image as this frame's image (this waits for the previous
+    frame to finish, and generates normally if it failed)"""
+    previous_result = worker.get_result(previous_future)
+    if not previous_result or not previous_result["generated_image_file"]:
+        return run_generate_job(job)
+
+    print(f"AI Render: Frame {job['frame']} looks the same as the previous frame, reusing its image")
+    generated_image_file = previous_result["generated_image_file"]
+    if job["animation_output_path"]:
+        image_format = os.path.splitext(generated_image_file)[1][1:]
+        generated_image_file = save_image_to_path(job["animation_output_path"], get_animation_frame_filename(job, image_format), generated_image_file, "animation image")
         if not generated_image_file:
             return False
 
+    return {
+        "last_generated_image_filename": generated_image_file,
+        "generated_image_file": generated_image_file,
+        "data_block_name": previous_result["data_block_name"],
+    }
+
+
+def finish_generate_job(scene, job, result):
+    """Load the generated image into the scene and view it (must run in the main thread)"""
+    props = scene.air_props
+
+    # if the job failed, stop here (an error will have already been handled)
+    if not result:
+        return False
+
+    # store this image filename as the last generated image (even if a later step failed)
+    if result["last_generated_image_filename"]:
+        props.last_generated_image_filename = result["last_generated_image_filename"]
+
+    generated_image_file = result["generated_image_file"]
+    if not generated_image_file:
+        return False
+
     # load the image into our scene
     try:
-        img = load_image(generated_image_file, after_output_filename_prefix)
+        img = load_image(generated_image_file, result["data_block_name"], job["is_animation_frame"])
     except:
         return handle_error("Couldn't load the image from Stable Diffusion", "load_sd_image")
 
+    # now that the new image is loaded, remove old temp files if we're over budget
+    temp_files.cleanup(utils.temp_files_max_size())
+
     try:
         # View the image in the Render Result view
         utils.view_sd_in_render_view(img, scene)
@@ -453,21 +852,24 @@ def sd_generate(scene, prompts=None, use_last_sd_image=False):
         return handle_error("Couldn't switch the view to the image from Stable Diffusion", "view_sd_image")
 
     # track an analytics event
+    params = job["params"]
+    snapshot = job["props"]
+    sd_backend = job["sd_backend"]
     additional_params = {
-        "backend": utils.sd_backend(),
-        "model": props.sd_model if sd_backend.supports_choosing_model() else "none",
-        "preset_style": props.preset_style if props.use_preset else "none",
-        "is_animation_frame": "yes" if prompts else "no",
-        "has_animated_prompt": "yes" if props.use_animated_prompts else "no",
-        "upscale_enabled": "yes" if props.do_upscale_automatically else "no",
-        "upscale_factor": props.upscale_factor,
-        "upscaler_model": props.upscaler_model,
-        "duration": round(time.time() - start_time),
+        "backend": job["backend_name"],
+        "model": snapshot.sd_model if sd_backend.supports_choosing_model() else "none",
+        "preset_style": snapshot.preset_style if snapshot.use_preset else "none",
+        "is_animation_frame": "yes" if job["is_animation_frame"] else "no",
+        "has_animated_prompt": "yes" if snapshot.use_animated_prompts else "no",
+        "upscale_enabled": "yes" if snapshot.do_upscale_automatically else "no",
+        "upscale_factor": snapshot.upscale_factor,
+        "upscaler_model": snapshot.upscaler_model,
+        "duration": round(time.time() - job["start_time"]),
     }
-    if props.controlnet_is_enabled and utils.sd_backend() == "automatic1111":
+    if snapshot.controlnet_is_enabled and job["backend_name"] == "automatic1111":
         additional_params["controlnet_enabled"] = "yes"
-        additional_params["controlnet_model"] = props.controlnet_model
-        additional_params["controlnet_module"] = props.controlnet_module
+        additional_params["controlnet_model"] = snapshot.controlnet_model
+        additional_params["controlnet_module"] = snapshot.controlnet_module
     else:
         additional_params["controlnet_enabled"] = "no"
         additional_params["controlnet_model"] = "none"
@@ -497,10 +899,21 @@ def sd_upscale(scene):
 
     # get the backend we're using
     sd_backend = utils.get_active_backend()
+    props_snapshot = utils.snapshot_props(scene)
 
-    # send to whichever API we're using
+    # upscale images that are too large for the backend in tiles (only decoding the image
+    # if we need to), or else send the whole image to whichever API we're using
     start_time = time.time()
-    generated_image_file = sd_backend.upscale(img_file, after_output_filename_prefix, props)
+    if props.use_tiled_upscaling and is_too_large_to_upscale(img_file, scene, sd_backend):
+        try:
+            pixels = image_buffers.read_pixels(img_file.read())
+        except Exception as e:
+            return handle_error(f"Couldn't read the last Stable Diffusion image: {e}", "load_last_generated_image")
+        finally:
+            img_file.close()
+        generated_image_file = upscale_in_tiles(pixels, after_output_filename_prefix, props_snapshot)
+    else:
+        generated_image_file = sd_backend.upscale(img_file, after_output_filename_prefix, props_snapshot)
 
     # if we didn't get a successful image, stop here (an error will have been handled by the api function)
     if not generated_image_file:
@@ -539,6 +952,82 @@ def sd_upscale(scene):
     return True
 
 
+def is_too_large_to_upscale(img_file, scene, sd_backend):
+    """Check if an image would be upscaled past the backend's limit, going by the size in
+    its header (or the scene's size, if the header can't be read)"""
+    size = image_buffers.get_image_size(img_file.read(64 * 1024))
+    img_file.seek(0)
+    if size is None:
+        return utils.are_upscaled_dimensions_too_large(scene)
+
+    width, height = size
+    upscale_factor = scene.air_props.upscale_factor
+    upscaled_width, upscaled_height = utils.get_sanitized_upscaled_dimensions(
+        round(width * upscale_factor), round(height * upscale_factor), sd_backend.max_upscaled_image_size()
+    )
+    return upscaled_width < round(width * upscale_factor) or upscaled_height < round(height * upscale_factor)
+
+
+def upscale_in_tiles(pixels, after_output_filename_prefix, props):
+    """Upscale an image that's too large for the backend to upscale in one go: cut it into
+    overlapping tiles that are within the backend's limit, upscale the tiles at the same
+    time, and blend them back together (must run in the main thread, to decode the tiles).
+    Returns the temp filename, or False"""
+    sd_backend = utils.get_active_backend()
+    upscale_factor = props.upscale_factor
+    height, width = pixels.shape[:2]
+    upscaled_width, upscaled_height = round(width * upscale_factor), round(height * upscale_factor)
+
+    max_tile_area = int(sd_backend.max_upscaled_image_size() / (upscale_factor * upscale_factor))
+    if max_tile_area < tiling.tile_step * tiling.tile_step:
+        return handle_error("The upscale factor is too large to upscale in tiles. Please decrease the upscale factor.", "upscale_factor_too_large")
+
+    tiles = tiling.get_tiles(width, height, max_tile_area, props.tile_overlap)
+
+    # scale each tile's position by the upscale factor, rounding the edges (not the sizes)
+    # so neighboring tiles still line up
+    upscaled_tiles = []
+    for x, y, tile_width, tile_height in tiles:
+        left, right = round(x * upscale_factor), round((x + tile_width) * upscale_factor)
+        bottom, top = round(y * upscale_factor), round((y + tile_height) * upscale_factor)
+        upscaled_tiles.append((left, bottom, right - left, top - bottom))
+
+    def upscale_tile(i):
+        tile_props = types.SimpleNamespace(**{
+            **vars(props),
+            "upscaled_width": upscaled_tiles[i][2],
+            "upscaled_height": upscaled_tiles[i][3],
+        })
+        tile_file = open_image_data(image_buffers.encode_png(tiling.crop(pixels, tiles[i])), f"{after_output_filename_prefix}-tile{i + 1}.png")
+        return sd_backend.upscale(tile_file, f"{after_output_filename_prefix}-tile{i + 1}", tile_props)
+
+    print(f"AI Render: Upscaling the {width}x{height} image in {len(tiles)} tiles")
+    max_workers = min(len(tiles), props.tile_max_concurrent)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-render-tile") as executor:
+        tile_files = list(executor.map(upscale_tile, range(len(tiles))))
+
+    try:
+        tile_pixels = []
+        for tile_file in tile_files:
+            if tile_file:
+                with open(tile_file, 'rb') as file:
+                    tile_pixels.append(image_buffers.read_pixels(file.read()))
+                os.remove(tile_file)
+
+        # if any tile failed, stop here (an error will have been handled by the api function)
+        if len(tile_pixels) < len(tiles):
+            return False
+
+        upscaled_pixels = tiling.blend(upscaled_tiles, tile_pixels, upscaled_width, upscaled_height, round(props.tile_overlap * upscale_factor))
+
+        output_file = utils.create_temp_file(after_output_filename_prefix + "-", suffix=".png")
+        with open(output_file, 'wb') as file:
+            file.write(image_buffers.encode_png(upscaled_pixels))
+        return output_file
+    except Exception as e:
+        return handle_error(f"Couldn't blend the upscaled tiles together: {e}", "blend_tiles")
+
+
 # Inpainting
 def sd_inpaint(scene):
     """Post to the API to generate a Stable Diffusion image with inpainting, and then process it"""
@@ -600,7 +1089,7 @@ def sd_inpaint(scene):
 
     # send to whichever API we're using
     start_time = time.time()
-    generated_image_file = sd_backend.inpaint(params, img_file, mask_file, after_output_filename_prefix, props)
+    generated_image_file = sd_backend.inpaint(params, img_file, mask_file, after_output_filename_prefix, utils.snapshot_props(scene))
 
     # if we didn't get a successful image, stop here (an error will have been handled by the api function)
     if not generated_image_file:
@@ -696,7 +1185,7 @@ def sd_outpaint(scene):
 
     # send to whichever API we're using
     start_time = time.time()
-    generated_image_file = sd_backend.outpaint(params, img_file, after_output_filename_prefix, props)
+    generated_image_file = sd_backend.outpaint(params, img_file, after_output_filename_prefix, utils.snapshot_props(scene))
 
     # if we didn't get a successful image, stop here (an error will have been handled by the api function)
     if not generated_image_file:
@@ -931,6 +1420,10 @@ class AIR_OT_render_animation(bpy.types.Operator):
     bl_idname = "ai_render.render_animation"
     bl_label = "Render Animation"
 
+    # how many frames to render ahead while earlier frames are still being processed
+    # by Stable Diffusion (the frames to process at once is set in the scene props)
+    max_frames_ahead = 1
+
     _timer = None
     _ticks_since_last_render = 0
     _finished = True
@@ -938,7 +1431,17 @@ class AIR_OT_render_animation(bpy.types.Operator):
     _end_frame = 0
     _frame_step = 1
     _current_frame = 0
+    _completed_frames = 0
+    _max_frames_ahead = 1
+    _max_frames_in_flight = 1
+    _frame_seeds = None
+    _skip_frames = None
+    _manifest = None
     _orig_current_frame = 0
+    _rendered_jobs = None
+    _previous_rendered_job = None
+    _previous_future = None
+    _in_flight = None
     _animated_prompts = None
     _animated_negative_prompts = None
     _static_prompt = None
@@ -948,7 +1451,7 @@ class AIR_OT_render_animation(bpy.types.Operator):
         scene = context.scene
 
         # do validation and setup
-        if validate_params(scene) and validate_animation_output_path(scene):
+        if validate_params(scene, can_tile=True) and validate_animation_output_path(scene):
             do_pre_render_setup(scene)
             do_pre_api_setup(scene)
         else:
@@ -974,8 +1477,35 @@ class AIR_OT_render_animation(bpy.types.Operator):
         self._end_frame = context.scene.frame_end
         self._frame_step = context.scene.frame_step
         self._current_frame = context.scene.frame_start
+        self._completed_frames = 0
+        self._rendered_jobs = collections.deque()
+        self._in_flight = []
+        self._previous_rendered_job = None
+        self._previous_future = None
         context.scene.air_props.is_rendering_animation_manually = True
 
+        # don't reuse a render from before this run (edits since then aren't all fingerprinted)
+        scene_fingerprint.clear()
+
+        # keep enough frames rendered ahead to fill every slot in flight
+        self._max_frames_in_flight = context.scene.air_props.animation_max_frames_in_flight
+
+        # keep every Automatic1111 server in the pool busy
+        if utils.sd_backend() == "automatic1111":
+            self._max_frames_in_flight = max(self._max_frames_in_flight, len(utils.local_sd_urls()))
+        self._max_frames_ahead = max(self.max_frames_ahead, self._max_frames_in_flight)
+        worker.ensure_max_workers(self._max_frames_in_flight)
+
+        # choose every frame's seed up front, so the results don't depend on the
+        # order in which frames are rendered or completed
+        self._frame_seeds = get_animation_frame_seeds(context.scene, range(self._start_frame, self._end_frame + 1, self._frame_step))
+
+        # track every frame in a manifest next to the output, and skip the frames a
+        # previous run already completed, if we're resuming
+        self._manifest = manifest.Manifest(manifest.get_manifest_file(utils.get_absolute_path_for_output_file(context.scene.air_props.animation_output_path, "")))
+        self._skip_frames = self._get_completed_frames_from_manifest(context) if context.scene.air_props.animation_resume else set()
+        self._completed_frames = len(self._skip_frames)
+
         context.scene.air_progress_status_message = ""
         context.scene.air_progress_label = self._get_label()
         context.scene.air_progress = 0
@@ -987,6 +1517,14 @@ class AIR_OT_render_animation(bpy.types.Operator):
     def _end_render(self, context, status_message):
         self._finished = True
 
+        # drop any frames that haven't been sent yet, and stop any that haven't started
+        self._rendered_jobs.clear()
+        for job, future in self._in_flight:
+            future.cancel()
+        self._in_flight.clear()
+        self._previous_rendered_job = None
+        self._previous_future = None
+
         context.scene.frame_current = self._orig_current_frame
         context.scene.air_props.is_rendering_animation_manually = False
 
@@ -995,20 +1533,26 @@ class AIR_OT_render_animation(bpy.types.Operator):
 
         context.window_manager.event_timer_remove(self._timer)
 
-    def _advance_frame(self, context):
-        self._current_frame += self._frame_step
-        if self._current_frame > context.scene.frame_end:
-            self._end_render(context, "Animation Render Complete")
+    def _has_frames_left_to_render(self):
+        return self._current_frame <= self._end_frame
 
     def _report_complete(self):
         print("AI Render animation completed")
         self.report({'INFO'}, "AI Render animation completed")
 
+    def _report_error(self, context):
+        print("AI Render animation ended with error")
+        self.report({'INFO'}, "AI Render animation ended with error")
+
+        # stop the other frames that are being generated, on the server too
+        cancellation.cancel()
+        self._end_render(context, "Animation Render Error")
+
     def _get_total_frames(self):
         return math.floor(((self._end_frame - self._start_frame) / self._frame_step) + 1)
 
     def _get_completed_frames(self):
-        return math.floor((self._current_frame - self._start_frame) / self._frame_step)
+        return self._completed_frames
 
     def _get_completed_percent(self):
         return round(self._get_completed_frames() / self._get_total_frames(), 2)
@@ -1016,48 +1560,122 @@ class AIR_OT_render_animation(bpy.types.Operator):
     def _get_label(self):
         return f"AI Render (Frame {self._get_completed_frames()}/{self._get_total_frames()})"
 
+    def _get_prompts(self, frame):
+        if self._animated_prompts:
+            prompt = get_prompt_at_frame(self._animated_prompts, frame)
+            negative_prompt = get_prompt_at_frame(self._animated_negative_prompts, frame)
+        else:
+            prompt = self._static_prompt
+            negative_prompt = self._negative_static_prompt
+
+        return {"prompt": prompt, "negative_prompt": negative_prompt}
+
+    def _get_completed_frames_from_manifest(self, context):
+        entries = self._manifest.get_frames()
+        use_random_seed = context.scene.air_props.use_random_seed
+        completed_frames = set()
+        for frame in self._frame_seeds:
+            prompts = self._get_prompts(frame)
+            prompt_hash = manifest.get_prompt_hash(prompts["prompt"], prompts["negative_prompt"])
+            seed = None if use_random_seed else self._frame_seeds[frame]
+            if manifest.is_frame_complete(entries.get(frame), prompt_hash, seed):
+                completed_frames.add(frame)
+
+        if completed_frames:
+            print(f"AI Render resuming animation, skipping {len(completed_frames)} completed frames")
+        return completed_frames
+
+    def _record_frame(self, job, result):
+        params = job["params"]
+        info = {
+            "seed": params["seed"],
+            "prompt_hash": manifest.get_prompt_hash(params["prompt"], params["negative_prompt"]),
+        }
+        if result and result["generated_image_file"]:
+            info["path"] = result["generated_image_file"]
+
+        try:
+            self._manifest.set_status(job["frame"], "blender", "done" if "path" in info else "failed", **info)
+        except OSError as e:
+            print(f"AI Render Warning: Couldn't update the animation manifest: {e}")
+
+    def _finish_completed_frames(self, context):
+        """Finish the frames that Stable Diffusion is done with, in whatever order they
+        complete (each one is saved by its own frame number). Returns False on error"""
+        completed = [item for item in self._in_flight if item[1].done()]
+        for item in completed:
+            self._in_flight.remove(item)
+            job, future = item
+            result = worker.get_result(future)
+            self._record_frame(job, result)
+            if not finish_generate_job(context.scene, job, result):
+                return False
+            self._completed_frames += 1
+
+        return True
+
+    def _send_rendered_frames(self):
+        """Send rendered frames to Stable Diffusion, as long as there's room in flight"""
+        while self._rendered_jobs and len(self._in_flight) < self._max_frames_in_flight:
+            job = self._rendered_jobs.popleft()
+            self._previous_future = submit_frame_job(job, self._previous_future)
+            self._in_flight.append((job, self._previous_future))
+
+    def _render_next_frame(self, context):
+        """Render the next frame with Blender, if we're not too far ahead. Returns False on error"""
+        while self._has_frames_left_to_render() and self._current_frame in self._skip_frames:
+            self._current_frame += self._frame_step
+
+        if not self._has_frames_left_to_render() or len(self._rendered_jobs) >= self._max_frames_ahead:
+            return True
+
+        job = render_frame(context, self._current_frame, self._get_prompts(self._current_frame), self._frame_seeds[self._current_frame])
+        if not job:
+            return False
+
+        mark_duplicate_frame(context.scene, job, self._previous_rendered_job)
+        self._previous_rendered_job = job
+        self._rendered_jobs.append(job)
+        self._current_frame += self._frame_step
+        return True
+
     def modal(self, context, event):
         if event.type == 'ESC':
             print("AI Render animation canceled")
             self.report({'INFO'}, "AI Render animation canceled")
+
+            # stop the frames that are being generated, on the server too
+            cancellation.cancel()
             self._end_render(context, "Animation Render Canceled")
             return {'CANCELLED'}
 
         elif event.type == 'TIMER' and not self._finished:
+            # finish any frames that are done, and keep Stable Diffusion busy
+            if not self._finish_completed_frames(context):
+                self._report_error(context)
+                return {'CANCELLED'}
+            self._send_rendered_frames()
+
             # after each render, wait a few ticks before starting the next one,
             # to give Blender time to update the UI
             if self._ticks_since_last_render < 2:
                 self._ticks_since_last_render += 1
-                return {'PASS_THROUGH'}
             else:
                 self._ticks_since_last_render = 0
 
-            # render the current frame
-            if context.scene.air_props.use_animated_prompts:
-                prompt = get_prompt_at_frame(self._animated_prompts, self._current_frame)
-                negative_prompt = get_prompt_at_frame(self._animated_negative_prompts, self._current_frame)
-            else:
-                prompt = self._static_prompt
-                negative_prompt = self._negative_static_prompt
-
-            was_successful = render_frame(context, self._current_frame, {"prompt": prompt, "negative_prompt": negative_prompt})
-
-            # if the render was successful, advance to the next frame.
-            # otherwise, quit here with an error.
-            if was_successful:
-                self._advance_frame(context)
-            else:
-                print("AI Render animation ended with error")
-                self.report({'INFO'}, "AI Render animation ended with error")
-                self._end_render(context, "Animation Render Error")
-                return {'CANCELLED'}
+                # render the next frame while the previous one is being processed
+                if not self._render_next_frame(context):
+                    self._report_error(context)
+                    return {'CANCELLED'}
+                self._send_rendered_frames()
 
             # update the progress bar
             context.scene.air_progress_label = self._get_label()
             context.scene.air_progress = self._get_completed_percent() * 100
 
             # if we're done, report success and quit. otherwise, pass through
-            if self._finished:
+            if not self._has_frames_left_to_render() and not self._rendered_jobs and not self._in_flight:
+                self._end_render(context, "Animation Render Complete")
                 self._report_complete()
                 return {'FINISHED'}
             else:
@@ -1151,7 +1769,7 @@ class AIR_OT_automatic1111_load_upscaler_models(bpy.types.Operator):
     bl_label = "Load ControlNet Models"
 
     def execute(self, context):
-        automatic1111_api.load_upscaler_models(context)
+        backend_metadata.refresh(force=True, show_errors=True, names=["upscaler_models"])
         return {'FINISHED'}
 
 
@@ -1161,7 +1779,7 @@ class AIR_OT_automatic1111_load_controlnet_models(bpy.types.Operator):
     bl_label = "Load ControlNet Models"
 
     def execute(self, context):
-        automatic1111_api.load_controlnet_models(context)
+        backend_metadata.refresh(force=True, show_errors=True, names=["controlnet_models"])
         return {'FINISHED'}
 
 
@@ -1171,7 +1789,7 @@ class AIR_OT_automatic1111_load_controlnet_modules(bpy.types.Operator):
     bl_label = "Load ControlNet Modules"
 
     def execute(self, context):
-        automatic1111_api.load_controlnet_modules(context)
+        backend_metadata.refresh(force=True, show_errors=True, names=["controlnet_modules"])
         return {'FINISHED'}
 
 
@@ -1181,11 +1799,24 @@ class AIR_OT_automatic1111_load_controlnet_models_and_modules(bpy.types.Operator
     bl_label = "Load ControlNet Models and Modules"
 
     def execute(self, context):
-        # load the models and modules from the Automatic1111 API
-        automatic1111_api.load_controlnet_models(context) and automatic1111_api.load_controlnet_modules(context)
+        # load the models and modules from the Automatic1111 API (in the background), and
+        # then set the default values for the ControlNet model and module
+        backend_metadata.refresh(
+            force=True,
+            show_errors=True,
+            on_refreshed=lambda: automatic1111_api.choose_controlnet_defaults(bpy.context),
+            names=["controlnet_models", "controlnet_modules"],
+        )
+        return {'FINISHED'}
 
-        # set the default values for the ControlNet model and module
-        automatic1111_api.choose_controlnet_defaults(context)
+
+class AIR_OT_clear_result_cache(bpy.types.Operator):
+    "Remove all of the cached Stable Diffusion images"
+    bl_idname = "ai_render.clear_result_cache"
+    bl_label = "Clear Cache"
+
+    def execute(self, context):
+        result_cache.clear()
         return {'FINISHED'}
 
 
@@ -1237,6 +1868,7 @@ classes = [
     AIR_OT_automatic1111_load_controlnet_models,
     AIR_OT_automatic1111_load_controlnet_modules,
     AIR_OT_automatic1111_load_controlnet_models_and_modules,
+    AIR_OT_clear_result_cache,
     AIR_OT_inpaint_from_last_sd_image,
     AIR_OT_outpaint_from_last_sd_image,
 ]
@@ -1,13 +1,25 @@
 import bpy
 from . import (
     addon_updater_ops,
+    backend_metadata,
     config,
+    http_pool,
     operators,
     properties,
+    result_cache,
+    server_health,
+    server_pool,
     utils,
 )
 
 
+def local_sd_extra_urls_changed(self, context):
+    # start the server pool over, so removed servers don't keep their stats, and check
+    # the new servers right away
+    server_pool.reset()
+    server_health.check_servers()
+
+
 class AIRPreferences(bpy.types.AddonPreferences):
     bl_idname = __package__
 
@@ -52,6 +64,14 @@ class AIRPreferences(bpy.types.AddonPreferences):
         name="URL of the Stable Diffusion Web Server",
         description="The location of the web server that is currently running on your local machine",
         default="http://127.0.0.1:7860",
+        update=backend_metadata.refresh_handler,
+    )
+
+    local_sd_extra_urls: bpy.props.StringProperty(
+        name="Additional Server URLs",
+        description="URLs of more Automatic1111 servers (separated by commas). Requests are spread across all of the servers, with faster servers getting more of them",
+        default="",
+        update=local_sd_extra_urls_changed,
     )
 
     local_sd_timeout: bpy.props.IntProperty(
@@ -62,6 +82,85 @@ class AIRPreferences(bpy.types.AddonPreferences):
         max=3600,
     )
 
+    local_sd_health_check: bpy.props.BoolProperty(
+        name="Check Server Health",
+        description="Check in the background that your local Stable Diffusion servers are answering, so renders fail right away (or go to another server) when one is down, instead of waiting for the timeout",
+        default=True,
+        update=server_health.check_now_handler,
+    )
+
+    local_sd_show_progress: bpy.props.BoolProperty(
+        name="Show Live Progress",
+        description="Show the real step count and time remaining while your local Stable Diffusion server generates an image",
+        default=True,
+    )
+
+    local_sd_show_previews: bpy.props.BoolProperty(
+        name="Show Live Previews",
+        description="Show the image in the render view while it's being generated (not while rendering animations). The Web UI's live previews setting must also be on",
+        default=False,
+    )
+
+    local_sd_preview_interval: bpy.props.FloatProperty(
+        name="Preview Interval (in seconds)",
+        description="How often to update the live preview",
+        default=2.0,
+        min=0.5,
+        max=30,
+    )
+
+    http_pool_size: bpy.props.IntProperty(
+        name="Connection Pool Size",
+        description="How many connections to keep open to each Stable Diffusion server. Increase this if you process several animation frames at once",
+        default=8,
+        min=1,
+        max=64,
+        update=http_pool.close_all_handler,
+    )
+
+    http_keep_alive: bpy.props.BoolProperty(
+        name="Keep Connections Alive",
+        description="Reuse connections between requests, instead of opening a new connection (and TLS handshake) every time",
+        default=True,
+        update=http_pool.close_all_handler,
+    )
+
+    use_result_cache: bpy.props.BoolProperty(
+        name="Cache Generated Images",
+        description="Reuse a previously generated image (instead of sending a new request) when the render, prompt, seed and all other settings are exactly the same",
+        default=True,
+    )
+
+    result_cache_max_size: bpy.props.IntProperty(
+        name="Cache Size (in MB)",
+        description="The most disk space to use for cached images. The least recently used images are removed first",
+        default=500,
+        min=10,
+        soft_max=10000,
+    )
+
+    temp_files_max_size: bpy.props.IntProperty(
+        name="Temp Files Size (in MB)",
+        description="The most disk space to use for temporary images. The oldest ones are removed first, but never while they're still in use",
+        default=1000,
+        min=10,
+        soft_max=10000,
+    )
+
+    do_purge_old_images: bpy.props.BoolProperty(
+        name="Remove Old Images From Memory",
+        description="Remove the oldest AI Render images from the blend file once there are more than a certain number (images that are in use, or have a fake user, are kept)",
+        default=False,
+    )
+
+    max_kept_images: bpy.props.IntProperty(
+        name="Images to Keep",
+        description="How many AI Render images to keep in the blend file",
+        default=20,
+        min=1,
+        soft_max=200,
+    )
+
     is_opted_out_of_analytics: bpy.props.BoolProperty(
         name="Opt out of analytics",
         description="If this is checked, the add-on will not send or store any analytics data",
@@ -170,12 +269,38 @@ class AIRPreferences(bpy.types.AddonPreferences):
                 col = row.column()
                 col.prop(self, "local_sd_url", text="")
 
+                row = box.row()
+                col = row.column()
+                col.label(text="Additional Server URLs:")
+                col = row.column()
+                col.prop(self, "local_sd_extra_urls", text="")
+
                 row = box.row()
                 col = row.column()
                 col.label(text="Timeout (in seconds):")
                 col = row.column()
                 col.prop(self, "local_sd_timeout", text="")
 
+                row = box.row()
+                row.prop(self, "local_sd_health_check")
+
+                row = box.row()
+                row.prop(self, "local_sd_show_progress")
+
+                row = box.row()
+                row.prop(self, "local_sd_show_previews")
+                if self.local_sd_show_previews:
+                    row.prop(self, "local_sd_preview_interval", text="Interval")
+
+                # show how each server in the pool is doing
+                server_urls = utils.local_sd_urls(context)
+                if len(server_urls) > 1:
+                    box.separator()
+                    for stats in server_pool.get_stats(server_urls):
+                        average_duration = f"{stats['average_duration']:.1f}s avg" if stats["average_duration"] is not None else "not used yet"
+                        row = box.row()
+                        row.label(text=f"{stats['url']}: {average_duration}, {stats['completed']} done, {stats['in_flight']} running", icon="ERROR" if stats["is_down"] else "CHECKMARK")
+
                 box.separator()
                 utils.label_multiline(box, text=f"AI Render will use your local Stable Diffusion installation. Please make sure the Web UI is launched and running in a terminal.", icon="KEYTYPE_BREAKDOWN_VEC", width=width_guess)
 
@@ -206,6 +331,9 @@ class AIRPreferences(bpy.types.AddonPreferences):
                 col = row.column()
                 col.prop(self, "local_sd_timeout", text="")
 
+                row = box.row()
+                row.prop(self, "local_sd_health_check")
+
                 box.separator()
                 utils.label_multiline(box, text=f"AI Render will use your local Stable Diffusion installation. Please make sure the Web UI is launched and running in a terminal.", icon="KEYTYPE_BREAKDOWN_VEC", width=width_guess)
 
@@ -214,6 +342,57 @@ class AIRPreferences(bpy.types.AddonPreferences):
                 row.operator("wm.url_open", text="Help with local installation", icon="URL").url \
                     = config.HELP_WITH_SHARK_INSTALLATION_URL
             
+            # Network
+            box = layout.box()
+            box.label(text="Network:")
+
+            row = box.row()
+            col = row.column()
+            col.label(text="Connection Pool Size:")
+            col = row.column()
+            col.prop(self, "http_pool_size", text="")
+
+            row = box.row()
+            row.prop(self, "http_keep_alive")
+
+            # Cache
+            box = layout.box()
+            box.label(text="Cache:")
+
+            row = box.row()
+            row.prop(self, "use_result_cache")
+
+            if self.use_result_cache:
+                row = box.row()
+                col = row.column()
+                col.label(text="Cache Size (in MB):")
+                col = row.column()
+                col.prop(self, "result_cache_max_size", text="")
+
+            row = box.row()
+            row.label(text=f"Cached images: {utils.format_byte_size(result_cache.get_size())}")
+            row.operator(operators.AIR_OT_clear_result_cache.bl_idname, icon="TRASH")
+
+            row = box.row()
+            col = row.column()
+            col.label(text="Temp Files Size (in MB):")
+            col = row.column()
+            col.prop(self, "temp_files_max_size", text="")
+
+            # Memory
+            box = layout.box()
+            box.label(text="Memory:")
+
+            row = box.row()
+            row.prop(self, "do_purge_old_images")
+
+            if self.do_purge_old_images:
+                row = box.row()
+                col = row.column()
+                col.label(text="Images to Keep:")
+                col = row.column()
+                col.prop(self, "max_kept_images", text="")
+
             # Notes
             box = layout.box()
             box.label(text="Note:")
@@ -24,7 +24,9 @@
 
 
 import bpy
+import functools
 import threading
+from . import task_queue
 
 # function to tag all info areas for redraw
 def tag_image_editor_areas_for_redraw(self, context):
@@ -43,12 +45,28 @@ def hide_progress_bar():
     bpy.context.scene.air_progress = -1
 
 
+# function to set progress (must be called in the main thread)
+def set_progress(percent, label, status_message):
+    scene = bpy.context.scene
+    if label is not None:
+        scene.air_progress_label = label
+    scene.air_progress_status_message = status_message
+    if percent is not None:
+        scene.air_progress = percent
+
+
 # public functions:
 def hide_progress_bar_after_delay(seconds = 4):
     timer = threading.Timer(seconds, hide_progress_bar)
     timer.start()
 
 
+def show_progress_from_any_thread(percent, label=None, status_message=""):
+    """Update the progress bar, from the main thread or a background worker. Pass
+    percent=None or label=None to leave them as they are"""
+    task_queue.add(functools.partial(set_progress, percent, label, status_message))
+
+
 def register():
     # a value between [0, 100] will show the slider
     bpy.types.Scene.air_progress = bpy.props.FloatProperty(
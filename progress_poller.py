@@ -0,0 +1,107 @@
+import base64
+import binascii
+import bpy
+import functools
+import requests
+import threading
+import time
+from . import (
+    http_pool,
+    image_pool,
+    progress_bar,
+    server_health,
+    task_queue,
+    utils,
+)
+
+
+# how often to check the server's progress (in seconds)
+poll_interval = 0.5
+
+preview_image_name = "AI Render Live Preview"
+
+
+def show_preview_image(poller, filename):
+    # (runs in the main thread) skip previews that arrive after the request is done, so
+    # they don't replace the finished image
+    if poller.stop_event.is_set():
+        return
+    try:
+        img = image_pool.load_image(filename, preview_image_name)
+        utils.view_sd_in_render_view(img, bpy.context.scene)
+    except Exception as e:
+        print(f"AI Render Warning: Couldn't show the preview image: {e}")
+
+
+class ProgressPoller:
+    """Check a local server's progress endpoint on a background thread while a request is
+    running, to show the real step count and ETA (and, optionally, a preview of the image
+    as it's being generated). Use it as a context manager around the request"""
+
+    def __init__(self, server_url, props, label="Automatic1111"):
+        self.server_url = server_url
+        self.props = props
+        self.label = label
+        self.is_rendering_animation = props.is_rendering_animation_manually
+        self.show_previews = props.local_sd_show_previews and not self.is_rendering_animation
+        self.preview_interval = props.local_sd_preview_interval
+        self.last_preview_time = 0
+        self.stop_event = threading.Event()
+
+    def __enter__(self):
+        threading.Thread(target=self.run, name="ai-render-progress", daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop_event.set()
+
+        # while rendering an animation, the progress bar is tracking frames
+        if not self.is_rendering_animation:
+            progress_bar.show_progress_from_any_thread(100, self.label)
+            progress_bar.hide_progress_bar_after_delay()
+
+    def run(self):
+        while not self.stop_event.wait(poll_interval):
+            wants_preview = self.show_previews and time.monotonic() - self.last_preview_time >= self.preview_interval
+            try:
+                response = http_pool.get_session("automatic1111", self.props).get(
+                    self.server_url + "/sdapi/v1/progress",
+                    params={"skip_current_image": "false" if wants_preview else "true"},
+                    timeout=(server_health.connect_timeout, 5),
+                )
+                progress = response.json()
+            except (requests.exceptions.RequestException, ValueError):
+                continue
+
+            if self.stop_event.is_set():
+                return
+            self.show_progress(progress)
+            if wants_preview and progress.get("current_image"):
+                self.show_preview(progress["current_image"])
+
+    def show_progress(self, progress):
+        state = progress.get("state") or {}
+        step = state.get("sampling_step", 0)
+        steps = state.get("sampling_steps", 0)
+        eta = progress.get("eta_relative") or 0
+        if not steps:
+            return
+
+        status_message = f"Step {step}/{steps}, ETA: {round(eta)}s"
+        if self.is_rendering_animation:
+            progress_bar.show_progress_from_any_thread(None, status_message=status_message)
+        else:
+            progress_bar.show_progress_from_any_thread(round(100 * progress.get("progress", 0)), self.label, status_message)
+
+    def show_preview(self, current_image):
+        self.last_preview_time = time.monotonic()
+        try:
+            # the image may or may not have a data url prefix
+            img_data = base64.b64decode(current_image.split(",", 1)[-1])
+            filename = utils.create_temp_file("ai-render-preview-")
+            with open(filename, "wb") as file:
+                file.write(img_data)
+        except (binascii.Error, OSError) as e:
+            print(f"AI Render Warning: Couldn't save the preview image: {e}")
+            return
+        task_queue.add(functools.partial(show_preview_image, self, filename))
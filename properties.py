@@ -1,6 +1,7 @@
 import bpy
 import random
 from . import (
+    backend_metadata,
     config,
     operators,
     utils,
@@ -80,6 +81,9 @@ def ensure_properties(self, context):
     ensure_upscaler_model(context)
     ensure_upscaler_factor(context)
 
+    # load the new backend's server lists (in the background)
+    backend_metadata.refresh()
+
 
 class AIRProperties(bpy.types.PropertyGroup):
     is_enabled: bpy.props.BoolProperty(
@@ -216,6 +220,11 @@ class AIRProperties(bpy.types.PropertyGroup):
         default=False,
         description="When true, will automatically upscale the image after each render",
     )
+    use_tiled_upscaling: bpy.props.BoolProperty(
+        name="Tiled Upscaling",
+        default=True,
+        description="When upscaling an image to a size that's larger than the Stable Diffusion backend allows, upscale it in overlapping tiles and blend them together (instead of shrinking the upscaled size to fit)",
+    )
     upscaler_model: bpy.props.EnumProperty(
         name="Upscaler Model",
         items=get_available_upscaler_models,
@@ -232,6 +241,61 @@ class AIRProperties(bpy.types.PropertyGroup):
         description="The path to save the animation",
         subtype="DIR_PATH",
     )
+    animation_max_frames_in_flight: bpy.props.IntProperty(
+        name="Max Frames In Flight",
+        default=1,
+        min=1,
+        soft_max=8,
+        max=16,
+        description="How many animation frames can be processed by Stable Diffusion at the same time. Increase this if your backend can process several requests in parallel (like Stable Horde, or Automatic1111 on several GPUs)",
+    )
+    do_skip_unchanged_renders: bpy.props.BoolProperty(
+        name="Skip Unchanged Renders",
+        default=False,
+        description="Reuse the last render instead of rendering again when nothing that affects it has changed (objects, camera, lights, materials, world and render settings). Useful for held frames and static shots",
+    )
+    do_skip_duplicate_frames: bpy.props.BoolProperty(
+        name="Reuse Duplicate Frames",
+        default=False,
+        description="When a rendered frame looks the same as the previous one (and the prompt, seed and other settings are the same), reuse the previous frame's AI image instead of generating a new one",
+    )
+    duplicate_frame_threshold: bpy.props.FloatProperty(
+        name="Duplicate Threshold",
+        default=0.005,
+        soft_min=0,
+        soft_max=0.05,
+        min=0,
+        max=1,
+        precision=3,
+        description="How different two renders can be (the average pixel difference, from 0 to 1) and still count as duplicates",
+    )
+    use_tiled_generation: bpy.props.BoolProperty(
+        name="Tiled Generation",
+        default=False,
+        description="Generate images that are larger than the Stable Diffusion backend allows by splitting them into overlapping tiles, generating each tile separately, and blending them back together",
+    )
+    tile_overlap: bpy.props.IntProperty(
+        name="Tile Overlap",
+        default=64,
+        soft_min=16,
+        soft_max=256,
+        min=0,
+        max=512,
+        description="How many pixels neighboring tiles overlap by. The overlap is blended, to hide the seams between tiles",
+    )
+    tile_max_concurrent: bpy.props.IntProperty(
+        name="Max Concurrent Tiles",
+        default=4,
+        min=1,
+        soft_max=8,
+        max=16,
+        description="How many tiles can be sent to Stable Diffusion at the same time",
+    )
+    animation_resume: bpy.props.BoolProperty(
+        name="Resume",
+        default=False,
+        description="Skip frames that were already generated (with the same prompt and seed) in a previous run, according to the manifest in the animation output path",
+    )
     animation_init_frame: bpy.props.IntProperty(
         name="Initial Animtion Frame",
         default=1,
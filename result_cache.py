@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from . import config, utils
+
+
+# private
+cache_subfolder = "cache"
+index_filename = "index.json"
+index_lock = threading.Lock()
+
+# the props (besides the params) that change what a backend generates
+model_prop_names = [
+    "sd_model",
+    "controlnet_is_enabled",
+    "controlnet_model",
+    "controlnet_module",
+    "controlnet_weight",
+]
+
+
+def get_cache_path():
+    return os.path.join(tempfile.gettempdir(), config.tmp_path_subfolder, cache_subfolder)
+
+
+def get_index_file():
+    return os.path.join(get_cache_path(), index_filename)
+
+
+def load_index():
+    try:
+        with open(get_index_file(), "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_index(index):
+    # write to a temp file and then swap it in, so a crash never leaves a half-written index
+    index_file = get_index_file()
+    with open(index_file + ".tmp", "w") as file:
+        json.dump(index, file)
+    os.replace(index_file + ".tmp", index_file)
+
+
+def remove_entry(index, key):
+    entry = index.pop(key)
+    try:
+        os.remove(os.path.join(get_cache_path(), entry["filename"]))
+    except OSError:
+        pass
+
+
+def evict(index, max_size):
+    # remove the least recently used images until the cache fits
+    total_size = sum(entry["size"] for entry in index.values())
+    for key in sorted(index, key=lambda key: index[key]["last_used"]):
+        if total_size <= max_size:
+            break
+        total_size -= index[key]["size"]
+        remove_entry(index, key)
+
+
+# public methods
+def get_cache_key(img_data, params, backend_name, props, server_urls=()):
+    """Hash everything that determines a generated image: the init image, the generation
+    params, the backend and the model settings. (Local servers could have any model
+    loaded, and any server in the pool could generate the image, so the whole list of
+    servers is part of the key too)"""
+    settings = {
+        "params": params,
+        "backend": backend_name,
+        "model": {name: getattr(props, name, None) for name in model_prop_names},
+        "servers": sorted(server_urls),
+    }
+
+    hash = hashlib.sha256(img_data)
+    hash.update(json.dumps(settings, sort_keys=True).encode())
+    return hash.hexdigest()
+
+
+def get(key, output_file):
+    """Copy a cached image into output_file. Returns True if the key was in the cache"""
+    with index_lock:
+        index = load_index()
+        if key not in index:
+            return False
+
+        try:
+            utils.copy_file(os.path.join(get_cache_path(), index[key]["filename"]), output_file)
+        except OSError:
+            remove_entry(index, key)
+            save_index(index)
+            return False
+
+        index[key]["last_used"] = time.time()
+        save_index(index)
+        return True
+
+
+def store(key, img_file, max_size):
+    """Copy a generated image into the cache, evicting old images to stay under max_size (in bytes)"""
+    size = os.path.getsize(img_file)
+    if size > max_size:
+        return
+
+    with index_lock:
+        os.makedirs(get_cache_path(), exist_ok=True)
+        index = load_index()
+
+        filename = key + os.path.splitext(img_file)[1]
+        utils.copy_file(img_file, os.path.join(get_cache_path(), filename))
+        index[key] = {
+            "filename": filename,
+            "size": size,
+            "last_used": time.time(),
+        }
+
+        evict(index, max_size)
+        save_index(index)
+
+
+def clear():
+    """Remove every cached image"""
+    with index_lock:
+        index = load_index()
+        for key in list(index):
+            remove_entry(index, key)
+        if os.path.isdir(get_cache_path()):
+            save_index(index)
+
+
+def get_size():
+    """Get the total size of the cached images (in bytes)"""
+    with index_lock:
+        return sum(entry["size"] for entry in load_index().values())
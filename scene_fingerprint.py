@@ -0,0 +1,212 @@
+import array
+import bpy
+import hashlib
+
+
+# how deep to follow nested structs (like color ramps) when hashing node settings
+max_property_depth = 3
+
+# private
+base_node_properties = frozenset(prop.identifier for prop in bpy.types.Node.bl_rna.properties)
+last_fingerprint = None
+last_img_data = None
+
+
+def hash_values(hash, *values):
+    hash.update(repr(values).encode())
+
+
+def hash_matrix(hash, matrix):
+    hash_values(hash, [tuple(row) for row in matrix])
+
+
+def hash_value(hash, value):
+    if isinstance(value, bpy.types.ID):
+        # datablocks (like a node's image) are hashed by name, so swapping one changes the hash
+        hash_values(hash, type(value).__name__, value.name, getattr(value, "filepath", None))
+    elif isinstance(value, (set, frozenset)):
+        hash_values(hash, tuple(sorted(value)))
+    elif hasattr(value, "__len__") and not isinstance(value, str):
+        hash_values(hash, tuple(value))
+    else:
+        hash_values(hash, value)
+
+
+def hash_properties(hash, struct, skip=frozenset(), depth=0):
+    """Hash the RNA properties of a struct, following nested structs and collections (like
+    a color ramp's elements, or a curve mapping's points) a few levels deep"""
+    for prop in struct.bl_rna.properties:
+        if prop.identifier == "rna_type" or prop.identifier in skip:
+            continue
+        value = getattr(struct, prop.identifier, None)
+        if prop.type == 'POINTER':
+            if value is None or isinstance(value, bpy.types.ID):
+                hash_value(hash, value)
+            elif depth < max_property_depth:
+                hash_properties(hash, value, depth=depth + 1)
+        elif prop.type == 'COLLECTION':
+            if depth < max_property_depth:
+                for item in value:
+                    hash_properties(hash, item, depth=depth + 1)
+        else:
+            hash_value(hash, value)
+
+
+def hash_node_tree(hash, node_tree, hashed_trees=None):
+    """Hash every node's settings and unlinked input values, and how the nodes are linked
+    (which covers what animation, drivers and edits change in materials, worlds and the
+    compositor). Node groups are followed into"""
+    if not node_tree:
+        return
+    hashed_trees = hashed_trees if hashed_trees is not None else set()
+    if node_tree.name in hashed_trees:
+        return
+    hashed_trees.add(node_tree.name)
+
+    for node in node_tree.nodes:
+        hash_values(hash, node.name, node.bl_idname, node.mute)
+        hash_properties(hash, node, skip=base_node_properties)
+        if getattr(node, "node_tree", None):
+            hash_node_tree(hash, node.node_tree, hashed_trees)
+        for socket in node.inputs:
+            if not socket.is_linked and hasattr(socket, "default_value"):
+                hash_value(hash, socket.default_value)
+
+    for link in node_tree.links:
+        hash_values(hash, link.from_node.name, link.from_socket.identifier, link.to_node.name, link.to_socket.identifier, getattr(link, "is_muted", False))
+
+
+def hash_mesh_vertices(hash, mesh):
+    coordinates = array.array("f", [0.0]) * (len(mesh.vertices) * 3)
+    mesh.vertices.foreach_get("co", coordinates)
+    hash.update(coordinates.tobytes())
+
+
+def hash_evaluated_geometry(hash, obj):
+    """Hash the evaluated shape of a non-mesh object (curves, text, surfaces, metaballs,
+    hair curves and point clouds)"""
+    if obj.type in {'CURVE', 'FONT', 'SURFACE', 'META'}:
+        mesh = obj.to_mesh()
+        try:
+            if mesh:
+                hash_mesh_vertices(hash, mesh)
+        finally:
+            obj.to_mesh_clear()
+    elif hasattr(obj.data, "attributes") and "position" in obj.data.attributes:
+        positions = obj.data.attributes["position"].data
+        coordinates = array.array("f", [0.0]) * (len(positions) * 3)
+        positions.foreach_get("vector", coordinates)
+        hash.update(coordinates.tobytes())
+
+
+def is_deformed(obj):
+    # vertex positions can change from frame to frame without the object moving
+    return bool(obj.modifiers) or (obj.type == 'MESH' and obj.data.shape_keys is not None)
+
+
+def depends_on_frame(scene):
+    """Check for things we can't fingerprint, which change every frame (image sequences,
+    movies, particles and simulations)"""
+    for img in bpy.data.images:
+        if img.users and img.source in {'SEQUENCE', 'MOVIE'}:
+            return True
+    for obj in scene.objects:
+        if obj.particle_systems:
+            return True
+        for modifier in obj.modifiers:
+            if modifier.type in {'FLUID', 'CLOTH', 'SOFT_BODY', 'DYNAMIC_PAINT', 'OCEAN', 'NODES'}:
+                return True
+    return False
+
+
+# public methods
+def get_fingerprint(context, image_format):
+    """Hash everything in the evaluated scene that affects the render: render and sampling
+    settings, the camera, every visible object's transform (and deformed or generated
+    geometry), lights, materials, the world and the compositor"""
+    scene = context.scene
+    depsgraph = context.evaluated_depsgraph_get()
+    hash = hashlib.sha256()
+
+    # render settings
+    render = scene.render
+    hash_values(hash, image_format, render.engine, render.resolution_x, render.resolution_y, render.resolution_percentage, render.film_transparent, render.use_compositing)
+    hash_values(hash, scene.view_settings.view_transform, scene.view_settings.look, scene.view_settings.exposure, scene.view_settings.gamma)
+    if render.engine == 'CYCLES' and hasattr(scene, "cycles"):
+        cycles = scene.cycles
+        hash_values(hash, cycles.samples, cycles.use_adaptive_sampling, cycles.adaptive_threshold, cycles.use_denoising, cycles.seed, cycles.use_animated_seed)
+    elif render.engine in {'BLENDER_EEVEE', 'BLENDER_EEVEE_NEXT'}:
+        hash_values(hash, scene.eevee.taa_render_samples)
+    else:
+        hash_values(hash, scene.display.render_aa)
+    if depends_on_frame(scene):
+        hash_values(hash, scene.frame_current)
+
+    # camera
+    if scene.camera:
+        camera = scene.camera.evaluated_get(depsgraph)
+        hash_matrix(hash, camera.matrix_world)
+        if camera.type == 'CAMERA':
+            data = camera.data
+            hash_values(hash, data.type, data.lens, data.ortho_scale, data.sensor_width, data.shift_x, data.shift_y, data.clip_start, data.clip_end, data.dof.use_dof, data.dof.focus_distance, data.dof.aperture_fstop)
+
+    # objects and lights
+    materials = set()
+    hashed_geometry = set()
+    for instance in depsgraph.object_instances:
+        obj = instance.object
+        hash_values(hash, obj.name, obj.type, obj.data.name if obj.data else None)
+        hash_matrix(hash, instance.matrix_world)
+
+        # hash the geometry of each evaluated object once, even if it's instanced many times
+        # (instances can be geometry generated by geometry nodes, so their meshes are always hashed)
+        geometry_key = (obj.name, obj.data.as_pointer() if obj.data else None)
+        is_new_geometry = geometry_key not in hashed_geometry
+        hashed_geometry.add(geometry_key)
+
+        if obj.type == 'LIGHT':
+            light = obj.data
+            hash_values(hash, light.type, tuple(light.color), light.energy, getattr(light, "shadow_soft_size", None))
+            if light.type == 'SUN':
+                hash_values(hash, light.angle)
+            elif light.type == 'SPOT':
+                hash_values(hash, light.spot_size, light.spot_blend)
+            hash_node_tree(hash, light.node_tree)
+        elif obj.type == 'MESH':
+            if is_new_geometry and (instance.is_instance or is_deformed(obj.original)):
+                hash_mesh_vertices(hash, obj.data)
+        elif obj.type not in {'CAMERA', 'EMPTY', 'LIGHT_PROBE', 'SPEAKER', 'ARMATURE', 'LATTICE'} and is_new_geometry:
+            hash_evaluated_geometry(hash, obj)
+
+        for slot in obj.material_slots:
+            if slot.material:
+                materials.add(slot.material.original)
+
+    # materials, world and compositor
+    for material in sorted(materials, key=lambda material: material.name):
+        hash_values(hash, material.name, tuple(material.diffuse_color))
+        hash_node_tree(hash, material.node_tree)
+    if scene.world:
+        hash_values(hash, tuple(scene.world.color))
+        hash_node_tree(hash, scene.world.node_tree)
+    if render.use_compositing:
+        hash_node_tree(hash, scene.node_tree)
+
+    return hash.hexdigest()
+
+
+def get_cached_render(fingerprint):
+    """Get the captured render for a fingerprint, if it's the last one we saw"""
+    if fingerprint is not None and fingerprint == last_fingerprint:
+        return last_img_data
+    return None
+
+
+def store_render(fingerprint, img_data):
+    global last_fingerprint, last_img_data
+    last_fingerprint = fingerprint
+    last_img_data = img_data
+
+
+def clear():
+    store_render(None, None)
@@ -1,9 +1,15 @@
 import bpy
-import base64
+import binascii
 import requests
+import time
 from .. import (
     config,
+    http_pool,
+    http_streaming,
     operators,
+    progress_poller,
+    server_health,
+    server_pool,
     utils,
 )
 
@@ -16,11 +22,8 @@ def generate(params, img_file, filename_prefix, props):
     # map the generic params to the specific ones for the Automatic1111 API
     map_params(params)
 
-    # add a base 64 encoded image to the params
-    params["init_images"] = [
-        "data:image/png;base64," + base64.b64encode(img_file.read()).decode()
-    ]
-    img_file.close()
+    # the image will be base 64 encoded into the request as it's sent
+    image_fields = {"init_images": [img_file]}
 
     # add args for ControlNet if it's enabled
     if props.controlnet_is_enabled:
@@ -29,6 +32,7 @@ def generate(params, img_file, filename_prefix, props):
         controlnet_weight = props.controlnet_weight
 
         if not controlnet_model:
+            img_file.close()
             return operators.handle_error(
                 f"No ContolNet model selected. Either choose a new model or disable ControlNet. [Get help]({config.HELP_WITH_CONTROLNET_URL})",
                 "controlnet_model_missing",
@@ -46,30 +50,17 @@ def generate(params, img_file, filename_prefix, props):
             }
         }
 
-    # prepare the server url
-    try:
-        server_url = get_server_url("/sdapi/v1/img2img")
-    except:
-        return operators.handle_error(
-            f"You need to specify a location for the local Stable Diffusion server in the add-on preferences. [Get help]({config.HELP_WITH_LOCAL_INSTALLATION_URL})",
-            "local_server_url_missing",
-        )
-
-    # send the API request
-    response = do_post(server_url, params)
-
-    if response == False:
-        return False
-
-    # handle the response
-    if response.status_code == 200:
-        return handle_success(response, filename_prefix)
-    else:
-        return handle_error(response)
+    # send the API request (to whichever server should finish it soonest), showing its progress
+    return send_to_server_pool("/sdapi/v1/img2img", params, image_fields, filename_prefix, props, show_progress=True)
 
 
 def upscale(img_file, filename_prefix, props):
 
+    # get the target dimensions, within the size the server can handle
+    upscaled_width, upscaled_height = utils.get_sanitized_upscaled_dimensions(
+        props.upscaled_width, props.upscaled_height, max_upscaled_image_size()
+    )
+
     # prepare the params
     data = {
         "resize_mode": 0,
@@ -78,10 +69,8 @@ def upscale(img_file, filename_prefix, props):
         "codeformer_visibility": 0,
         "codeformer_weight": 0,
         "upscaling_resize": props.upscale_factor,
-        "upscaling_resize_w": utils.sanitized_upscaled_width(max_upscaled_image_size()),
-        "upscaling_resize_h": utils.sanitized_upscaled_height(
-            max_upscaled_image_size()
-        ),
+        "upscaling_resize_w": upscaled_width,
+        "upscaling_resize_h": upscaled_height,
         "upscaling_crop": True,
         "upscaler_1": props.upscaler_model,
         "upscaler_2": "None",
@@ -89,51 +78,29 @@ def upscale(img_file, filename_prefix, props):
         "upscale_first": True,
     }
 
-    # add a base 64 encoded image to the params
-    data["image"] = (
-        "data:image/png;base64," + base64.b64encode(img_file.read()).decode()
-    )
-    img_file.close()
+    # the image will be base 64 encoded into the request as it's sent
+    image_fields = {"image": img_file}
 
-    # prepare the server url
-    try:
-        server_url = get_server_url("/sdapi/v1/extra-single-image")
-    except:
-        return operators.handle_error(
-            f"You need to specify a location for the local Stable Diffusion server in the add-on preferences. [Get help]({config.HELP_WITH_LOCAL_INSTALLATION_URL})",
-            "local_server_url_missing",
-        )
-
-    # send the API request
-    response = do_post(server_url, data)
+    # send the API request (to whichever server should finish it soonest)
+    return send_to_server_pool("/sdapi/v1/extra-single-image", data, image_fields, filename_prefix, props)
 
-    # print log info for debugging
-    # debug_log(response)
 
-    if response == False:
-        return False
-
-    # handle the response
-    if response.status_code == 200:
-        return handle_success(response, filename_prefix)
-    else:
-        return handle_error(response)
+def cancel_requests(server_urls, api_key):
+    """Interrupt whatever the servers are generating for us. A server only stops the
+    request it's working on, so this returns True while any of our requests are still
+    running (to be called again)"""
+    busy_urls = [stats["url"] for stats in server_pool.get_stats(server_urls) if stats["in_flight"] > 0]
+    for url in busy_urls:
+        try:
+            print(f"Interrupting the local Stable Diffusion server: {url}")
+            http_pool.get_session("automatic1111").post(url + "/sdapi/v1/interrupt", headers=create_headers(), timeout=(server_health.connect_timeout, 5))
+        except requests.exceptions.RequestException as e:
+            print(f"AI Render Warning: Couldn't interrupt {url}: {e}")
+    return bool(busy_urls)
 
 
 def handle_success(response, filename_prefix):
 
-    # ensure we have the type of response we are expecting
-    try:
-        response_obj = response.json()
-        base64_img = response_obj.get("images", [False])[0] or response_obj.get("image")
-    except:
-        print("Automatic1111 response content: ")
-        print(response.content)
-        return operators.handle_error(
-            "Received an unexpected response from the Automatic1111 Stable Diffusion server.",
-            "unexpected_response",
-        )
-
     # create a temp file
     try:
         output_file = utils.create_temp_file(filename_prefix + "-")
@@ -142,22 +109,30 @@ def handle_success(response, filename_prefix):
             "Couldn't create a temp file to save image.", "temp_file"
         )
 
-    # decode base64 image
+    # decode the base64 image straight from the response into the temp file
     try:
-        img_binary = base64.b64decode(base64_img.replace("data:image/png;base64,", ""))
-    except:
+        was_image_found = http_streaming.write_base64_field_to_file(
+            response, ["images", "image"], output_file
+        )
+    except (binascii.Error, ValueError):
         return operators.handle_error(
             "Couldn't decode base64 image from the Automatic1111 Stable Diffusion server.",
             "base64_decode",
         )
-
-    # save the image to the temp file
-    try:
-        with open(output_file, "wb") as file:
-            file.write(img_binary)
-    except:
+    except requests.exceptions.RequestException:
+        was_image_found = False
+    except OSError:
         return operators.handle_error("Couldn't write to temp file.", "temp_file_write")
 
+    # ensure we got the type of response we are expecting
+    if not was_image_found:
+        print("Automatic1111 response status: ")
+        print(response.status_code)
+        return operators.handle_error(
+            "Received an unexpected response from the Automatic1111 Stable Diffusion server.",
+            "unexpected_response",
+        )
+
     # return the temp file
     return output_file
 
@@ -210,24 +185,72 @@ def create_headers():
     }
 
 
-def get_server_url(path):
-    base_url = utils.local_sd_url().rstrip("/").strip()
-    if not base_url:
-        raise Exception("Couldn't get the Automatic1111 server url")
-    else:
-        return base_url + path
-
-
 def map_params(params):
     params["denoising_strength"] = round(1 - params["image_similarity"], 2)
     params["sampler_index"] = params["sampler"]
 
 
-def do_post(url, data):
+def send_to_server_pool(path, data, image_fields, filename_prefix, props, show_progress=False):
+    # skip the servers that are known to be down, and fail right away if they all are
+    urls = props.local_sd_urls
+    healthy_urls = server_health.get_healthy_urls(urls)
+    if urls and not healthy_urls:
+        http_streaming.close_image_fields(image_fields)
+        return operators.handle_error(
+            f"The local Stable Diffusion server isn't responding. Make sure it's running at the location you specified in the add-on preferences. [Get help]({config.HELP_WITH_LOCAL_INSTALLATION_URL})",
+            "local_server_not_found",
+        )
+
+    # choose a server from the pool
+    try:
+        node = server_pool.acquire(healthy_urls)
+    except:
+        http_streaming.close_image_fields(image_fields)
+        return operators.handle_error(
+            f"You need to specify a location for the local Stable Diffusion server in the add-on preferences. [Get help]({config.HELP_WITH_LOCAL_INSTALLATION_URL})",
+            "local_server_url_missing",
+        )
+
+    # send the API request, and handle the response (timing the whole thing, so
+    # faster servers get more of the requests)
+    start_time = time.monotonic()
+    result = False
+    try:
+        # check the server's progress while it generates, if we should
+        if show_progress and props.local_sd_show_progress:
+            with progress_poller.ProgressPoller(node.url, props):
+                response = do_post(node.url + path, data, image_fields, props)
+        else:
+            response = do_post(node.url + path, data, image_fields, props)
+
+        # print log info for debugging
+        # debug_log(response)
+
+        if response == False:
+            result = False
+        elif response.status_code == 200:
+            result = handle_success(response, filename_prefix)
+        else:
+            result = handle_error(response)
+    finally:
+        server_pool.release(node, time.monotonic() - start_time, bool(result))
+
+    return result
+
+
+def do_post(url, data, image_fields, props):
+    # stream the JSON body, so large images are encoded as they're sent
+    headers = create_headers()
+    headers["Content-Type"] = "application/json"
+
     # send the API request
     try:
-        return requests.post(
-            url, json=data, headers=create_headers(), timeout=utils.local_sd_timeout()
+        return http_pool.get_session("automatic1111", props).post(
+            url,
+            data=http_streaming.iter_json_body(data, image_fields),
+            headers=headers,
+            timeout=(server_health.connect_timeout, props.local_sd_timeout),
+            stream=True,
         )
     except requests.exceptions.ConnectionError:
         return operators.handle_error(
@@ -437,88 +460,78 @@ def choose_controlnet_defaults(context):
             return
 
 
-def load_upscaler_models(context):
-    try:
-        # set a flag to indicate whether the list of models has already been loaded
-        was_already_loaded = is_upscaler_model_list_loaded(context)
-
-        # get the list of available upscaler models from the Automatic1111 api
-        server_url = get_server_url("/sdapi/v1/upscalers")
-        headers = {"Accept": "application/json"}
-        response = requests.get(server_url, headers=headers, timeout=5)
-        response_obj = response.json()
-        print("Upscaler models returned from Automatic1111 API:")
-        print(response_obj)
-
-        # store the list of models in the scene properties
-        if not response_obj:
-            return operators.handle_error(
-                f"No upscaler models are installed in Automatic1111. [Get help]({config.HELP_WITH_AUTOMATIC1111_UPSCALING_URL})"
-            )
-        else:
-            # map the response object to a list of model names
-            upscaler_models = []
-            for model in response_obj:
-                if model["name"] != "None":
-                    upscaler_models.append(model["name"])
-            context.scene.air_props.automatic1111_available_upscaler_models = (
-                "||||".join(upscaler_models)
-            )
+def get_metadata(server_url, path, props):
+    headers = {"Accept": "application/json"}
+    response = http_pool.get_session("automatic1111", props).get(server_url + path, headers=headers, timeout=(server_health.connect_timeout, 10))
+    response.raise_for_status()
+    return response.json()
 
-            # if the list of models was not already loaded, set the default model
-            if not was_already_loaded:
-                context.scene.air_props.upscaler_model = default_upscaler_model()
 
-            # return success
-            return True
-    except:
-        return operators.handle_error(
-            f"Couldn't get the list of available upscaler models from the Automatic1111 server. [Get help]({config.HELP_WITH_AUTOMATIC1111_UPSCALING_URL})"
-        )
+def fetch_upscaler_models(server_url, props):
+    # get the list of available upscaler models from the Automatic1111 api
+    try:
+        response_obj = get_metadata(server_url, "/sdapi/v1/upscalers", props)
+        upscaler_models = [model["name"] for model in response_obj if model["name"] != "None"]
+    except Exception:
+        raise RuntimeError(f"Couldn't get the list of available upscaler models from the Automatic1111 server. [Get help]({config.HELP_WITH_AUTOMATIC1111_UPSCALING_URL})")
+
+    if not upscaler_models:
+        raise RuntimeError(f"No upscaler models are installed in Automatic1111. [Get help]({config.HELP_WITH_AUTOMATIC1111_UPSCALING_URL})")
+    return upscaler_models
 
 
-def load_controlnet_models(context):
+def fetch_controlnet_models(server_url, props):
+    # get the list of available controlnet models from the Automatic1111 api
     try:
-        # get the list of available controlnet models from the Automatic1111 api
-        server_url = get_server_url("/controlnet/model_list")
-        headers = {"Accept": "application/json"}
-        response = requests.get(server_url, headers=headers, timeout=5)
-        response_obj = response.json()
-        print("ControlNet models returned from Automatic1111 API:")
-        print(response_obj)
-
-        # store the list of models in the scene properties
-        models = response_obj["model_list"]
-        if not models:
-            return operators.handle_error(
-                f"You don't have any ControlNet models installed. You will need to download them from Hugging Face. [Get help]({config.HELP_WITH_CONTROLNET_URL})"
-            )
-        else:
-            context.scene.air_props.controlnet_available_models = "||||".join(models)
-            return True
-    except:
-        return operators.handle_error(
-            f"Couldn't get the list of available ControlNet models from the Automatic1111 server. Make sure ControlNet is installed and activated. [Get help]({config.HELP_WITH_CONTROLNET_URL})"
-        )
+        models = get_metadata(server_url, "/controlnet/model_list", props)["model_list"]
+    except Exception:
+        raise RuntimeError(f"Couldn't get the list of available ControlNet models from the Automatic1111 server. Make sure ControlNet is installed and activated. [Get help]({config.HELP_WITH_CONTROLNET_URL})")
+
+    if not models:
+        raise RuntimeError(f"You don't have any ControlNet models installed. You will need to download them from Hugging Face. [Get help]({config.HELP_WITH_CONTROLNET_URL})")
+    return models
 
 
-def load_controlnet_modules(context):
+def fetch_controlnet_modules(server_url, props):
+    # get the list of available controlnet modules from the Automatic1111 api, in
+    # alphabetical order
     try:
-        # get the list of available controlnet modules from the Automatic1111 api
-        server_url = get_server_url("/controlnet/module_list")
-        headers = {"Accept": "application/json"}
-        response = requests.get(server_url, headers=headers, timeout=5)
-        response_obj = response.json()
-        print("ControlNet modules returned from Automatic1111 API:")
-        print(response_obj)
-
-        # sort the modules in alphabetical order, and then store them in the scene
-        # properties
-        modules = response_obj["module_list"]
-        modules.sort()
-        context.scene.air_props.controlnet_available_modules = "||||".join(modules)
-        return True
-    except:
-        return operators.handle_error(
-            f"Couldn't get the list of available ControlNet modules from the Automatic1111 server. Make sure ControlNet is installed and activated. [Get help]({config.HELP_WITH_CONTROLNET_URL})"
-        )
+        return sorted(get_metadata(server_url, "/controlnet/module_list", props)["module_list"])
+    except Exception:
+        raise RuntimeError(f"Couldn't get the list of available ControlNet modules from the Automatic1111 server. Make sure ControlNet is installed and activated. [Get help]({config.HELP_WITH_CONTROLNET_URL})")
+
+
+def get_metadata_fetchers():
+    """Get the functions that fetch each list of server metadata (they're given the
+    server url and a snapshot of the preferences, and run on background threads)"""
+    return {
+        "upscaler_models": fetch_upscaler_models,
+        "controlnet_models": fetch_controlnet_models,
+        "controlnet_modules": fetch_controlnet_modules,
+    }
+
+
+def apply_metadata(scene, lists):
+    """Store fetched lists of server metadata in a scene's properties (only the ones that
+    changed, so the file isn't marked as modified for nothing)"""
+    props = scene.air_props
+
+    if "upscaler_models" in lists:
+        upscaler_models = "||||".join(lists["upscaler_models"])
+        if props.automatic1111_available_upscaler_models != upscaler_models:
+            was_already_loaded = props.automatic1111_available_upscaler_models != ""
+            props.automatic1111_available_upscaler_models = upscaler_models
+
+            # if the list of models was not already loaded, set the default model
+            if not was_already_loaded:
+                props.upscaler_model = default_upscaler_model()
+
+    if "controlnet_models" in lists:
+        controlnet_models = "||||".join(lists["controlnet_models"])
+        if props.controlnet_available_models != controlnet_models:
+            props.controlnet_available_models = controlnet_models
+
+    if "controlnet_modules" in lists:
+        controlnet_modules = "||||".join(lists["controlnet_modules"])
+        if props.controlnet_available_modules != controlnet_modules:
+            props.controlnet_available_modules = controlnet_modules
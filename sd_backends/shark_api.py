@@ -1,10 +1,13 @@
 import bpy
-import base64
+import binascii
 import requests
 import random
 from .. import (
     config,
+    http_pool,
+    http_streaming,
     operators,
+    server_health,
     utils,
 )
 
@@ -16,23 +19,21 @@ def generate(params, img_file, filename_prefix, props):
     # Configuring custom params for shark
     params["denoising_strength"] = round(1 - params["image_similarity"], 2)
 
-    # add a base 64 encoded image to the params
-    params["init_images"] = [
-        "data:image/png;base64," + base64.b64encode(img_file.read()).decode()
-    ]
-    img_file.close()
+    # the image will be base 64 encoded into the request as it's sent
+    image_fields = {"init_images": [img_file]}
 
     # get server url
     try:
-        server_url = get_server_url("/sdapi/v1/img2img")
+        server_url = get_server_url("/sdapi/v1/img2img", props.local_sd_url)
     except:
+        img_file.close()
         return operators.handle_error(
             f"You need to specify a location for the local Stable Diffusion server in the add-on preferences. [Get help]({config.HELP_WITH_SHARK_INSTALLATION_URL})",
             "local_server_url_missing",
         )
 
     # send the API request
-    response = do_post(server_url, params)
+    response = do_post(server_url, params, image_fields, props)
 
     # Error already handled
     if response is False:
@@ -46,31 +47,34 @@ def generate(params, img_file, filename_prefix, props):
 
 def upscale(img_file, filename_prefix, props):
 
+    # get the target dimensions, within the size the server can handle
+    upscaled_width, upscaled_height = utils.get_sanitized_upscaled_dimensions(
+        props.upscaled_width, props.upscaled_height, max_upscaled_image_size()
+    )
+
     data = {
         "prompt": "",
         "negative_prompt": "",
         "seed": random.randint(1000000000, 2147483647),
-        "height": utils.sanitized_upscaled_height(max_upscaled_image_size()),
-        "width": utils.sanitized_upscaled_width(max_upscaled_image_size()),
+        "height": upscaled_height,
+        "width": upscaled_width,
         "steps": 50,
         "noise_level": 20,
         "cfg_scale": 7,
     }
 
-    data["init_images"] = [
-        "data:image/png;base64," + base64.b64encode(img_file.read()).decode()
-    ]
-    img_file.close()
+    image_fields = {"init_images": [img_file]}
 
     try:
-        server_url = get_server_url("/sdapi/v1/upscaler")
+        server_url = get_server_url("/sdapi/v1/upscaler", props.local_sd_url)
     except:
+        img_file.close()
         return operators.handle_error(
             f"You need to specify a location for the local Stable Diffusion server in the add-on preferences. [Get help]({config.HELP_WITH_SHARK_INSTALLATION_URL})",
             "local_server_url_missing",
         )
 
-    response = do_post(server_url, data)
+    response = do_post(server_url, data, image_fields, props)
 
     if response is False:
         return False
@@ -81,27 +85,34 @@ def upscale(img_file, filename_prefix, props):
         return handle_error(response)
 
 
-def inpaint(params, img_file, mask_file, filename_prefix, props):
+def cancel_requests(server_urls, api_key):
+    """Interrupt whatever the server is generating"""
+    if not server_urls:
+        return False
+    try:
+        server_url = get_server_url("/sdapi/v1/interrupt", server_urls[0])
+        print(f"Interrupting the SHARK server: {server_url}")
+        http_pool.get_session("shark").post(server_url, headers=create_headers(), timeout=(server_health.connect_timeout, 5))
+    except Exception as e:
+        print(f"AI Render Warning: Couldn't interrupt the SHARK server: {e}")
+    return False
 
-    params["image"] = (
-        "data:image/png;base64," + base64.b64encode(img_file.read()).decode()
-    )
-    img_file.close()
 
-    params["mask"] = (
-        "data:image/png;base64," + base64.b64encode(mask_file.read()).decode()
-    )
-    mask_file.close()
+def inpaint(params, img_file, mask_file, filename_prefix, props):
+
+    image_fields = {"image": img_file, "mask": mask_file}
 
     try:
-        server_url = get_server_url("/sdapi/v1/inpaint")
+        server_url = get_server_url("/sdapi/v1/inpaint", props.local_sd_url)
     except:
+        img_file.close()
+        mask_file.close()
         return operators.handle_error(
             f"You need to specify a location for the local Stable Diffusion server in the add-on preferences. [Get help]({config.HELP_WITH_SHARK_INSTALLATION_URL})",
             "local_server_url_missing",
         )
 
-    response = do_post(server_url, params)
+    response = do_post(server_url, params, image_fields, props)
 
     if response is False:
         return False
@@ -114,20 +125,18 @@ def inpaint(params, img_file, mask_file, filename_prefix, props):
 
 def outpaint(params, img_file, filename_prefix, props):
 
-    params["init_images"] = [
-        "data:image/png;base64," + base64.b64encode(img_file.read()).decode()
-    ]
-    img_file.close()
+    image_fields = {"init_images": [img_file]}
 
     try:
-        server_url = get_server_url("/sdapi/v1/outpaint")
+        server_url = get_server_url("/sdapi/v1/outpaint", props.local_sd_url)
     except:
+        img_file.close()
         return operators.handle_error(
             f"You need to specify a location for the local Stable Diffusion server in the add-on preferences. [Get help]({config.HELP_WITH_SHARK_INSTALLATION_URL})",
             "local_server_url_missing",
         )
 
-    response = do_post(server_url, params)
+    response = do_post(server_url, params, image_fields, props)
 
     if response is False:
         return False
@@ -140,18 +149,6 @@ def outpaint(params, img_file, filename_prefix, props):
 
 def handle_success(response, filename_prefix):
 
-    # ensure we have the type of response we are expecting
-    try:
-        response_obj = response.json()
-        base64_img = response_obj.get("images", [False])[0] or response_obj.get("image")
-    except:
-        print("SHARK response content: ")
-        print(response.content)
-        return operators.handle_error(
-            "Received an unexpected response from the Shark Stable Diffusion server.",
-            "unexpected_response",
-        )
-
     # create a temp file
     try:
         output_file = utils.create_temp_file(filename_prefix + "-")
@@ -160,22 +157,30 @@ def handle_success(response, filename_prefix):
             "Couldn't create a temp file to save image.", "temp_file"
         )
 
-    # decode base64 image
+    # decode the base64 image straight from the response into the temp file
     try:
-        img_binary = base64.b64decode(base64_img.replace("data:image/png;base64,", ""))
-    except:
+        was_image_found = http_streaming.write_base64_field_to_file(
+            response, ["images", "image"], output_file
+        )
+    except (binascii.Error, ValueError):
         return operators.handle_error(
             "Couldn't decode base64 image from the Shark Stable Diffusion server.",
             "base64_decode",
         )
-
-    # save the image to the temp file
-    try:
-        with open(output_file, "wb") as file:
-            file.write(img_binary)
-    except:
+    except requests.exceptions.RequestException:
+        was_image_found = False
+    except OSError:
         return operators.handle_error("Couldn't write to temp file.", "temp_file_write")
 
+    # ensure we got the type of response we are expecting
+    if not was_image_found:
+        print("SHARK response status: ")
+        print(response.status_code)
+        return operators.handle_error(
+            "Received an unexpected response from the Shark Stable Diffusion server.",
+            "unexpected_response",
+        )
+
     # return the temp file
     return output_file
 
@@ -225,11 +230,27 @@ def create_headers():
     }
 
 
-def do_post(url, data):
+def do_post(url, data, image_fields, props):
+    # fail right away if the server is known to be down
+    if not server_health.is_healthy(props.local_sd_url.rstrip("/").strip()):
+        http_streaming.close_image_fields(image_fields)
+        return operators.handle_error(
+            f"The local Stable Diffusion server isn't responding. Make sure it's running at the location you specified in the add-on preferences. [Get help]({config.HELP_WITH_SHARK_INSTALLATION_URL})",
+            "local_server_not_found",
+        )
+
+    # stream the JSON body, so large images are encoded as they're sent
+    headers = create_headers()
+    headers["Content-Type"] = "application/json"
+
     # send the API request
     try:
-        return requests.post(
-            url, json=data, headers=create_headers(), timeout=utils.local_sd_timeout()
+        return http_pool.get_session("shark", props).post(
+            url,
+            data=http_streaming.iter_json_body(data, image_fields),
+            headers=headers,
+            timeout=(server_health.connect_timeout, props.local_sd_timeout),
+            stream=True,
         )
     except requests.exceptions.ConnectionError:
         return operators.handle_error(
@@ -248,8 +269,8 @@ def do_post(url, data):
         )
 
 
-def get_server_url(path):
-    base_url = utils.local_sd_url().rstrip("/").strip()
+def get_server_url(path, local_sd_url):
+    base_url = local_sd_url.rstrip("/").strip()
     if not base_url:
         raise Exception("Couldn't get the shark server url")
     else:
@@ -327,6 +348,15 @@ def default_upscaler_model():
     return "stabilityai/stable-diffusion-2-1-base"
 
 
+def get_metadata_fetchers():
+    # there are no server lists to fetch for this backend
+    return {}
+
+
+def apply_metadata(scene, lists):
+    pass
+
+
 def get_samplers():
     # NOTE: Keep the number values (fourth item in the tuples) in sync with the other
     # backends, like Automatic1111. These act like an internal unique ID for Blender
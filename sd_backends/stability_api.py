@@ -1,8 +1,9 @@
 import bpy
-import base64
 import requests
 from .. import (
     config,
+    http_pool,
+    http_streaming,
     operators,
     utils,
 )
@@ -20,7 +21,7 @@ def generate(params, img_file, filename_prefix, props):
     mapped_params = map_params(params)
 
     # create the headers
-    headers = create_headers()
+    headers = create_headers(props.dream_studio_api_key)
 
     # prepare the URL (specifically setting the engine id)
     api_url = f"{config.STABILITY_API_V1_URL}{props.sd_model}/image-to-image"
@@ -32,12 +33,13 @@ def generate(params, img_file, filename_prefix, props):
 
     # send the API request
     try:
-        response = requests.post(
+        response = http_pool.get_session("dreamstudio", props).post(
             api_url,
             headers=headers,
             files=files,
             data=mapped_params,
             timeout=request_timeout(),
+            stream=True,
         )
         img_file.close()
     except requests.exceptions.ReadTimeout:
@@ -59,7 +61,7 @@ def generate(params, img_file, filename_prefix, props):
 
 def upscale(img_file, filename_prefix, props):
     # create the headers
-    headers = create_headers()
+    headers = create_headers(props.dream_studio_api_key)
 
     # prepare the URL
     api_url = f"{config.STABILITY_API_V2_URL}upscale/fast"
@@ -74,8 +76,13 @@ def upscale(img_file, filename_prefix, props):
 
     # send the API request
     try:
-        response = requests.post(
-            api_url, headers=headers, files=files, data=data, timeout=request_timeout()
+        response = http_pool.get_session("dreamstudio", props).post(
+            api_url,
+            headers=headers,
+            files=files,
+            data=data,
+            timeout=request_timeout(),
+            stream=True,
         )
         img_file.close()
     except requests.exceptions.ReadTimeout:
@@ -95,29 +102,30 @@ def upscale(img_file, filename_prefix, props):
         return handle_error(response)
 
 
+def cancel_requests(server_urls, api_key):
+    # DreamStudio generates in the request itself, so there's nothing to stop on the server
+    return False
+
+
 def handle_success(response, filename_prefix):
     try:
-        data = response.json()
         output_file = utils.create_temp_file(filename_prefix + "-")
     except:
         return operators.handle_error(
             f"Couldn't create a temp file to save image", "temp_file"
         )
 
+    # decode the base64 image straight from the response into the temp file
+    # (v2 responses have an "image" field, v1 responses have a list of "artifacts")
     try:
-        if "image" in data:
-            with open(output_file, "wb") as file:
-                file.write(base64.b64decode(data["image"]))
-        elif "artifacts" in data:
-            for i, image in enumerate(data["artifacts"]):
-                with open(output_file, "wb") as file:
-                    file.write(base64.b64decode(image["base64"]))
+        if http_streaming.write_base64_field_to_file(
+            response, ["image", "base64"], output_file
+        ):
+            return output_file
         else:
             return operators.handle_error(
                 f"DreamStudio returned an unexpected response", "unexpected_response"
             )
-
-        return output_file
     except:
         return operators.handle_error(
             f"DreamStudio returned an unexpected response", "unexpected_response"
@@ -152,11 +160,11 @@ def handle_error(response):
 # PRIVATE SUPPORT FUNCTIONS:
 
 
-def create_headers():
+def create_headers(api_key):
     return {
         "User-Agent": f"Blender/{bpy.app.version_string}",
         "Accept": "application/json",
-        "Authorization": f"Bearer {utils.get_dream_studio_api_key()}",
+        "Authorization": f"Bearer {api_key}",
     }
 
 
@@ -304,6 +312,15 @@ def default_upscaler_model():
     return "fast"
 
 
+def get_metadata_fetchers():
+    # there are no server lists to fetch for this backend
+    return {}
+
+
+def apply_metadata(scene, lists):
+    pass
+
+
 def request_timeout():
     return 55
 
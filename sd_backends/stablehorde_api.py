@@ -1,11 +1,16 @@
 import bpy
 import base64
+import threading
 import time
 import requests
 
 from .. import (
+    cancellation,
     config,
+    http_pool,
+    http_streaming,
     operators,
+    progress_bar,
     utils,
 )
 
@@ -13,10 +18,15 @@ API_REQUEST_URL = config.STABLE_HORDE_API_URL_BASE + "/generate/async"
 API_CHECK_URL = config.STABLE_HORDE_API_URL_BASE + "/generate/check"
 API_GET_URL = config.STABLE_HORDE_API_URL_BASE + "/generate/status"
 
+# the ids of our requests that the horde is still working on (so they can be canceled)
+request_ids = set()
+request_ids_lock = threading.Lock()
+
 # CORE FUNCTIONS:
 
 
 def generate(params, img_file, filename_prefix, props):
+    generation = cancellation.get_generation()
 
     # map the generic params to the specific ones for the Stable Horde API
     stablehorde_params = map_params(params)
@@ -28,13 +38,13 @@ def generate(params, img_file, filename_prefix, props):
     img_file.close()
 
     # create the headers
-    headers = create_headers()
+    headers = create_headers(props.stable_horde_api_key)
 
     # send the API request
     start_time = time.monotonic()
     try:
         print(f"Sending request to Stable Horde API: {API_REQUEST_URL}")
-        response = requests.post(
+        response = http_pool.get_session("stablehorde", props).post(
             API_REQUEST_URL, json=stablehorde_params, headers=headers, timeout=20
         )
         id = response.json()["id"]
@@ -51,44 +61,86 @@ def generate(params, img_file, filename_prefix, props):
             f"Error with Stable Horde. Full error message: {e}", "unknown_error"
         )
 
-    # Check the status of the request (For at most request_timeout seconds)
-    for i in range(request_timeout()):
+    with request_ids_lock:
+        request_ids.add(id)
+    try:
+        return wait_for_image(id, headers, start_time, generation, filename_prefix, props)
+    finally:
+        with request_ids_lock:
+            request_ids.discard(id)
+
+
+def wait_for_image(id, headers, start_time, generation, filename_prefix, props):
+    # Check the status of the request (for at most request_timeout seconds), waiting
+    # between checks based on how long the horde estimates the request will take
+    deadline = start_time + request_timeout()
+    delay = min_poll_delay()
+    while True:
+        if time.monotonic() + delay > deadline:
+            return operators.handle_error(
+                f"Timeout generating image. Try again in a moment, or get help. [Get help with timeouts]({config.HELP_WITH_TIMEOUTS_URL})",
+                "timeout",
+            )
+
+        # stop waiting if it's canceled (the request is deleted from the horde by cancel_requests)
+        if not cancellation.sleep(delay, generation):
+            print(f"Stopped waiting for canceled Stable Horde request: {id}")
+
+            # if it was canceled while we were sending it, cancel_requests missed it
+            with request_ids_lock:
+                was_missed = id in request_ids
+                request_ids.discard(id)
+            if was_missed:
+                delete_request(id, headers, props)
+            return False
+
         try:
-            time.sleep(1)
             URL = API_CHECK_URL + "/" + id
             print(f"Checking status of request at Stable Horde API: {URL}")
-            response = requests.get(URL, headers=headers, timeout=20)
+            response = http_pool.get_session("stablehorde", props).get(URL, headers=headers, timeout=20)
+            response_obj = response.json()
             print(
-                f"Waiting for {str(time.monotonic() - start_time)}s. Response: {response.json()}"
+                f"Waiting for {str(time.monotonic() - start_time)}s. Response: {response_obj}"
             )
-            if response.json()["done"] == True:
-                print(
-                    "The horde took "
-                    + str(time.monotonic() - start_time)
-                    + "s to imagine this frame."
-                )
-                break
         except requests.exceptions.ReadTimeout:
             # Ignore timeouts
             print("WARN: Timeout while checking status")
+            delay = min_poll_delay()
+            continue
         except Exception as e:  # Catch all other errors
             return operators.handle_error(
                 f"Error while checking status: {e}", "unknown_error"
             )
-    if i == request_timeout() - 1:
-        return operators.handle_error(
-            f"Timeout generating image. Try again in a moment, or get help. [Get help with timeouts]({config.HELP_WITH_TIMEOUTS_URL})",
-            "timeout",
-        )
+
+        if response_obj.get("done") == True:
+            print(
+                "The horde took "
+                + str(time.monotonic() - start_time)
+                + "s to imagine this frame."
+            )
+            if not props.is_rendering_animation_manually:
+                progress_bar.show_progress_from_any_thread(100, "Stable Horde")
+                progress_bar.hide_progress_bar_after_delay()
+            break
+        elif response_obj.get("faulted") or response_obj.get("is_possible") == False:
+            return operators.handle_error(
+                f"Stable Horde couldn't generate this image. Full server response: {response_obj}",
+                "unknown_error",
+            )
+
+        wait_time = response_obj.get("wait_time", 0)
+        queue_position = response_obj.get("queue_position", 0)
+        show_progress(props, time.monotonic() - start_time, wait_time, queue_position)
+        delay = get_poll_delay(wait_time)
 
     # Get the image
     try:
         URL = API_GET_URL + "/" + id
         print(f"Retrieving image from Stable Horde API: {URL}")
-        response = requests.get(URL, headers=headers, timeout=20)
+        response = http_pool.get_session("stablehorde", props).get(URL, headers=headers, timeout=20)
         # handle the response
         if response.status_code == 200:
-            return handle_success(response, filename_prefix)
+            return handle_success(response, filename_prefix, props)
         else:
             return handle_error(response)
 
@@ -103,7 +155,29 @@ def generate(params, img_file, filename_prefix, props):
         )
 
 
-def handle_success(response, filename_prefix):
+def cancel_requests(server_urls, api_key):
+    """Delete our requests from the horde, so workers stop spending time (and our kudos)
+    on them"""
+    with request_ids_lock:
+        ids = list(request_ids)
+        request_ids.clear()
+
+    headers = create_headers(api_key)
+    for id in ids:
+        delete_request(id, headers)
+    return False
+
+
+def delete_request(id, headers, props=None):
+    try:
+        URL = API_GET_URL + "/" + id
+        print(f"Canceling request at Stable Horde API: {URL}")
+        http_pool.get_session("stablehorde", props).delete(URL, headers=headers, timeout=20)
+    except requests.exceptions.RequestException as e:
+        print(f"AI Render Warning: Couldn't cancel Stable Horde request {id}: {e}")
+
+
+def handle_success(response, filename_prefix, props):
 
     # ensure we have the type of response we are expecting
     try:
@@ -131,22 +205,20 @@ def handle_success(response, filename_prefix):
             "Couldn't create a temp file to save image.", "temp_file"
         )
 
-    # Retrieve img from img_url and write it to the temp file
-    img_binary = None
+    # Retrieve img from img_url and stream it into the temp file
     try:
         print(f"Retrieving image file from R2: {img_url}")
-        response = requests.get(img_url, timeout=20)
-        img_binary = response.content
+        response = http_pool.get_session("stablehorde", props).get(img_url, timeout=20, stream=True)
+        http_streaming.write_response_to_file(response, output_file)
     except requests.exceptions.ReadTimeout:
         return operators.handle_error(
             f"Timeout retrieving file. Try again in a moment, or get help. [Get help with timeouts]({config.HELP_WITH_TIMEOUTS_URL})",
             "timeout",
         )
-
-    # save the image to the temp file
-    try:
-        with open(output_file, "wb") as file:
-            file.write(img_binary)
+    except requests.exceptions.RequestException as e:
+        return operators.handle_error(
+            f"Error retrieving file from Stable Horde. Full error message: {e}", "unknown_error"
+        )
     except:
         return operators.handle_error("Couldn't write to temp file.", "temp_file_write")
 
@@ -164,11 +236,11 @@ def handle_error(response):
 # PRIVATE SUPPORT FUNCTIONS:
 
 
-def create_headers():
+def create_headers(api_key):
     # if no api-key specified, use the default non-authenticated api-key
     apikey = (
-        utils.get_stable_horde_api_key()
-        if not utils.get_stable_horde_api_key().strip() == ""
+        api_key
+        if not api_key.strip() == ""
         else "0000000000"
     )
 
@@ -181,6 +253,35 @@ def create_headers():
     }
 
 
+def min_poll_delay():
+    return 1
+
+
+def max_poll_delay():
+    return 10
+
+
+def get_poll_delay(wait_time):
+    # check again in about half the estimated time, so we notice as soon as possible
+    # when the image is ready, without checking more often than needed
+    return max(min_poll_delay(), min(max_poll_delay(), wait_time / 2))
+
+
+def show_progress(props, elapsed_time, wait_time, queue_position):
+    if queue_position > 0:
+        status_message = f"Stable Horde queue position: {queue_position}, ETA: {round(wait_time)}s"
+    else:
+        status_message = f"Stable Horde ETA: {round(wait_time)}s"
+
+    # while rendering an animation, the progress bar is tracking frames, so only
+    # update the status message
+    if props.is_rendering_animation_manually:
+        progress_bar.show_progress_from_any_thread(None, status_message=status_message)
+    else:
+        percent = round(100 * elapsed_time / (elapsed_time + wait_time)) if elapsed_time + wait_time > 0 else 0
+        progress_bar.show_progress_from_any_thread(percent, "Stable Horde", status_message)
+
+
 def map_params(params):
     return {
         "prompt": params["prompt"],
@@ -237,6 +338,15 @@ def default_upscaler_model():
     return "none"
 
 
+def get_metadata_fetchers():
+    # there are no server lists to fetch for this backend
+    return {}
+
+
+def apply_metadata(scene, lists):
+    pass
+
+
 def request_timeout():
     return 300
 
@@ -0,0 +1,122 @@
+import bpy
+import requests
+import threading
+import time
+from . import (
+    task_queue,
+    utils,
+)
+
+
+# how often to check each local server (in seconds)
+check_interval = 10
+
+# how long to wait for a server to accept a connection, and then to answer a health check
+# (in seconds). Requests to the servers use the same connect timeout, so a server that's
+# down fails in seconds, instead of after the full read timeout
+connect_timeout = 3
+read_timeout = 5
+
+# private
+statuses = {}
+statuses_lock = threading.Lock()
+checking_urls = set()
+
+
+def get_server_urls():
+    backend = utils.sd_backend()
+    if backend == "automatic1111":
+        return utils.local_sd_urls()
+    elif backend == "shark":
+        url = utils.local_sd_url().rstrip("/").strip()
+        return [url] if url else []
+    return []
+
+
+def check_server(url):
+    """Check that a server answers (any http response will do), on a background thread"""
+    start_time = time.monotonic()
+    try:
+        requests.head(url, timeout=(connect_timeout, read_timeout), allow_redirects=False)
+        status = {"is_healthy": True, "latency": time.monotonic() - start_time, "error": ""}
+    except requests.exceptions.ConnectTimeout:
+        status = {"is_healthy": False, "latency": None, "error": "Not reachable"}
+    except requests.exceptions.ReadTimeout:
+        status = {"is_healthy": False, "latency": None, "error": "Not responding"}
+    except requests.exceptions.RequestException:
+        status = {"is_healthy": False, "latency": None, "error": "Not running"}
+    status["checked_at"] = time.time()
+
+    with statuses_lock:
+        previous_status = statuses.get(url)
+        statuses[url] = status
+        checking_urls.discard(url)
+
+    # show the change in the ui
+    if previous_status is None or previous_status["is_healthy"] != status["is_healthy"]:
+        if not status["is_healthy"]:
+            print(f"AI Render Warning: The Stable Diffusion server at {url} is down ({status['error']})")
+        task_queue.add(redraw_properties_areas)
+
+
+def redraw_properties_areas():
+    for window in bpy.context.window_manager.windows:
+        if not window.screen:
+            continue
+        for area in window.screen.areas:
+            if area.type == 'PROPERTIES':
+                area.tag_redraw()
+
+
+def check_servers():
+    """Start checking every configured local server (runs in the main thread, on a timer)"""
+    if not utils.get_addon_preferences().local_sd_health_check:
+        with statuses_lock:
+            statuses.clear()
+        return check_interval
+
+    urls = get_server_urls()
+    with statuses_lock:
+        # forget servers that aren't configured anymore
+        for url in list(statuses):
+            if url not in urls:
+                del statuses[url]
+
+        urls_to_check = [url for url in urls if url not in checking_urls]
+        checking_urls.update(urls_to_check)
+
+    for url in urls_to_check:
+        threading.Thread(target=check_server, args=(url,), name="ai-render-health", daemon=True).start()
+    return check_interval
+
+
+# public methods
+def get_status(url):
+    """Get the last health check of a server, or None if it hasn't been checked yet"""
+    with statuses_lock:
+        return statuses.get(url)
+
+
+def is_healthy(url):
+    """Check if a server is healthy (servers that haven't been checked yet are assumed to be)"""
+    status = get_status(url)
+    return status is None or status["is_healthy"]
+
+
+def get_healthy_urls(urls):
+    return [url for url in urls if is_healthy(url)]
+
+
+def check_now_handler(self, context):
+    # check right away after the settings change, instead of waiting for the next check
+    check_servers()
+
+
+def register():
+    if not bpy.app.timers.is_registered(check_servers):
+        bpy.app.timers.register(check_servers, first_interval=1, persistent=True)
+
+
+def unregister():
+    if bpy.app.timers.is_registered(check_servers):
+        bpy.app.timers.unregister(check_servers)
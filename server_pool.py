@@ -0,0 +1,99 @@
+import threading
+import time
+
+
+# how much each new request duration counts towards a server's average (the rest
+# comes from its previous average)
+duration_smoothing = 0.3
+
+# how long to skip a server after a request to it fails (in seconds)
+failure_cooldown = 30
+
+# private
+nodes = {}
+nodes_lock = threading.Lock()
+
+
+class ServerNode:
+    """A server in the pool, with its current load and how fast it has been"""
+
+    def __init__(self, url):
+        self.url = url
+        self.in_flight = 0
+        self.average_duration = None
+        self.completed = 0
+        self.failed = 0
+        self.down_until = 0
+
+    def is_down(self):
+        return time.monotonic() < self.down_until
+
+
+def get_node(url):
+    if url not in nodes:
+        nodes[url] = ServerNode(url)
+    return nodes[url]
+
+
+def get_expected_finish_time(node, default_duration):
+    # a new request would wait for everything already running on this server
+    average_duration = node.average_duration if node.average_duration is not None else default_duration
+    return (node.in_flight + 1) * average_duration
+
+
+# public methods
+def acquire(urls):
+    """Choose the server that should finish a new request soonest (based on how many
+    requests it's running and how fast it has been), and count the request against it.
+    Servers that recently failed are skipped, unless they all have. Call release() when
+    the request is done"""
+    if not urls:
+        raise ValueError("No server urls")
+
+    with nodes_lock:
+        candidates = [get_node(url) for url in urls]
+        available = [node for node in candidates if not node.is_down()] or candidates
+
+        # servers we haven't timed yet are assumed to be as fast as the average one
+        known_durations = [node.average_duration for node in candidates if node.average_duration is not None]
+        default_duration = sum(known_durations) / len(known_durations) if known_durations else 1
+
+        node = min(available, key=lambda node: get_expected_finish_time(node, default_duration))
+        node.in_flight += 1
+        return node
+
+
+def release(node, duration, succeeded):
+    """Record how a request to a server went"""
+    with nodes_lock:
+        node.in_flight -= 1
+        if succeeded:
+            node.completed += 1
+            node.down_until = 0
+            if node.average_duration is None:
+                node.average_duration = duration
+            else:
+                node.average_duration += duration_smoothing * (duration - node.average_duration)
+        else:
+            node.failed += 1
+            node.down_until = time.monotonic() + failure_cooldown
+
+
+def get_stats(urls):
+    """Get a snapshot of each server's state, for showing in the UI"""
+    with nodes_lock:
+        return [
+            {
+                "url": url,
+                "in_flight": nodes[url].in_flight if url in nodes else 0,
+                "average_duration": nodes[url].average_duration if url in nodes else None,
+                "completed": nodes[url].completed if url in nodes else 0,
+                "is_down": nodes[url].is_down() if url in nodes else False,
+            }
+            for url in urls
+        ]
+
+
+def reset():
+    with nodes_lock:
+        nodes.clear()
@@ -1,5 +1,6 @@
 import bpy
 import queue
+import traceback
 from bpy.app.handlers import persistent
 
 
@@ -9,7 +10,11 @@ execution_queue = queue.Queue()
 def execute_queued_functions():
     while not execution_queue.empty():
         function = execution_queue.get()
-        function()
+        # keep going if one function fails (an exception would stop the timer for good)
+        try:
+            function()
+        except Exception:
+            traceback.print_exc()
     return 0.2
 
 
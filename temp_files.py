@@ -0,0 +1,99 @@
+import bpy
+import os
+import tempfile
+import threading
+import time
+from . import config
+
+
+# private
+lock = threading.Lock()
+
+# never remove files this new, because a background job could still be writing to
+# (or moving) them
+min_age_to_remove = 60
+
+
+def get_referenced_files():
+    """Get the files that Blender is still using: each scene's last generated image,
+    and the files behind any loaded images"""
+    referenced_files = set()
+    for scene in bpy.data.scenes:
+        if scene.air_props.last_generated_image_filename:
+            referenced_files.add(os.path.normpath(scene.air_props.last_generated_image_filename))
+    for img in bpy.data.images:
+        if img.filepath:
+            referenced_files.add(os.path.normpath(bpy.path.abspath(img.filepath)))
+    return referenced_files
+
+
+def get_removable_files():
+    """Get the temp files that are safe to remove, as a list of (mtime, size, filename)"""
+    temp_path = get_temp_path()
+    referenced_files = get_referenced_files()
+    now = time.time()
+    files = []
+
+    try:
+        entries = list(os.scandir(temp_path))
+    except OSError:
+        return files
+
+    for entry in entries:
+        if not entry.is_file():
+            continue
+        if os.path.normpath(entry.path) in referenced_files:
+            continue
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        if now - stat.st_mtime < min_age_to_remove:
+            continue
+        files.append((stat.st_mtime, stat.st_size, entry.path))
+
+    return files
+
+
+# public methods
+def get_temp_path():
+    """Get this process's own temp folder. Other Blender instances (and headless workers)
+    share the parent folder, so each one only ever cleans up its own files"""
+    return os.path.join(tempfile.gettempdir(), config.tmp_path_subfolder, f"process-{os.getpid()}")
+
+
+def create_temp_file(prefix, suffix=".png"):
+    """Create an empty temp file in our own temp folder (so we can clean it up), and
+    return its filename. This is safe to call from a background thread"""
+    temp_path = get_temp_path()
+    os.makedirs(temp_path, exist_ok=True)
+    file_descriptor, filename = tempfile.mkstemp(prefix=prefix, suffix=suffix, dir=temp_path)
+    os.close(file_descriptor)
+    return filename
+
+
+def cleanup(max_size):
+    """Remove the least recently used temp files, until the total size of the removable
+    ones is under max_size (in bytes). Files that Blender still references are never
+    removed. This must run in the main thread"""
+    with lock:
+        files = get_removable_files()
+        total_size = sum(size for mtime, size, filename in files)
+
+        for mtime, size, filename in sorted(files):
+            if total_size <= max_size:
+                break
+            try:
+                os.remove(filename)
+                total_size -= size
+            except OSError:
+                pass
+
+
+def unregister():
+    # remove every temp file that isn't still in use (and the folder, if that was all of them)
+    cleanup(0)
+    try:
+        os.rmdir(get_temp_path())
+    except OSError:
+        pass
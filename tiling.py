@@ -0,0 +1,90 @@
+import math
+import numpy
+
+
+# tile dimensions are multiples of this, like every other Stable Diffusion image size
+tile_step = 64
+
+
+def get_tile_size(width, height, max_area):
+    """Get the largest tile size (in multiples of tile_step) that's within max_area, and
+    not bigger than the image"""
+    tile_width = min(width, int(math.sqrt(max_area)) // tile_step * tile_step)
+    tile_height = min(height, max_area // tile_width // tile_step * tile_step)
+
+    # if the tile is as tall as the image, it can be wider
+    if tile_height == height:
+        tile_width = min(width, max_area // tile_height // tile_step * tile_step)
+
+    return tile_width, tile_height
+
+
+def get_tile_positions(length, tile_length, min_overlap):
+    """Spread tiles evenly along one side, overlapping by at least min_overlap"""
+    if length <= tile_length:
+        return [0]
+
+    count = math.ceil((length - min_overlap) / (tile_length - min_overlap))
+    count = max(count, 2)
+    return [round(i * (length - tile_length) / (count - 1)) for i in range(count)]
+
+
+def get_feather_ramp(length, feather, fade_start, fade_end):
+    # weights that fade in/out over `feather` pixels, on the sides that overlap other tiles
+    ramp = numpy.ones(length, dtype=numpy.float32)
+    fade = (numpy.arange(feather, dtype=numpy.float32) + 0.5) / feather
+    if fade_start:
+        ramp[:feather] = numpy.minimum(ramp[:feather], fade)
+    if fade_end:
+        ramp[-feather:] = numpy.minimum(ramp[-feather:], fade[::-1])
+    return ramp
+
+
+# public methods
+def get_tiles(width, height, max_area, min_overlap):
+    """Split an image into overlapping tiles that are each within max_area. Returns a list
+    of (x, y, width, height), with y measured from the bottom (like Blender's pixels)"""
+    tile_width, tile_height = get_tile_size(width, height, max_area)
+    min_overlap = min(min_overlap, tile_width // 2, tile_height // 2)
+    return [
+        (x, y, tile_width, tile_height)
+        for y in get_tile_positions(height, tile_height, min_overlap)
+        for x in get_tile_positions(width, tile_width, min_overlap)
+    ]
+
+
+def crop(pixels, tile):
+    x, y, width, height = tile
+    return pixels[y:y + height, x:x + width]
+
+
+def resize(pixels, width, height):
+    """Resize pixels (nearest neighbor), in case a backend returned a tile at a different size"""
+    if pixels.shape[0] == height and pixels.shape[1] == width:
+        return pixels
+    rows = numpy.linspace(0, pixels.shape[0] - 1, height).round().astype(int)
+    columns = numpy.linspace(0, pixels.shape[1] - 1, width).round().astype(int)
+    return pixels[rows][:, columns]
+
+
+def blend(tiles, tile_pixels, width, height, feather):
+    """Blend tiles back into one image, feathering the edges where tiles overlap, so there
+    are no visible seams"""
+    channels = tile_pixels[0].shape[2]
+    total = numpy.zeros((height, width, channels), dtype=numpy.float32)
+    total_weight = numpy.zeros((height, width, 1), dtype=numpy.float32)
+
+    for tile, pixels in zip(tiles, tile_pixels):
+        x, y, tile_width, tile_height = tile
+        pixels = resize(pixels, tile_width, tile_height)
+        tile_feather = max(1, min(feather, tile_width // 2, tile_height // 2))
+
+        # only fade the edges that aren't on the border of the whole image
+        horizontal = get_feather_ramp(tile_width, tile_feather, x > 0, x + tile_width < width)
+        vertical = get_feather_ramp(tile_height, tile_feather, y > 0, y + tile_height < height)
+        weight = (vertical[:, None] * horizontal[None, :])[:, :, None]
+
+        total[y:y + tile_height, x:x + tile_width] += pixels[:, :, :channels] * weight
+        total_weight[y:y + tile_height, x:x + tile_width] += weight
+
+    return total / numpy.maximum(total_weight, 1e-6)
@@ -3,7 +3,9 @@ import math
 from .. import (
     addon_updater_ops,
     config,
+    image_pool,
     operators,
+    server_health,
     utils,
 )
 
@@ -92,7 +94,7 @@ class AIR_PT_setup(bpy.types.Panel):
     @classmethod
     def are_dimensions_small_enough(cls, context):
         return (
-            not utils.are_dimensions_too_large(context.scene)
+            (not utils.are_dimensions_too_large(context.scene) or context.scene.air_props.use_tiled_generation)
             and context.scene.air_props.error_key != "dimensions_too_large"
         )
 
@@ -107,6 +109,24 @@ class AIR_PT_setup(bpy.types.Panel):
     def poll(cls, context):
         return utils.is_installation_valid() and context.scene.air_props.is_enabled
 
+    @classmethod
+    def draw_server_health(cls, layout):
+        urls = server_health.get_server_urls()
+        if not urls or not utils.get_addon_preferences().local_sd_health_check:
+            return
+
+        layout.separator()
+        box = layout.box()
+        for url in urls:
+            status = server_health.get_status(url)
+            row = box.row()
+            if status is None:
+                row.label(text=f"{url}: Checking...", icon="TIME")
+            elif status["is_healthy"]:
+                row.label(text=f"{url}: Online ({round(status['latency'] * 1000)} ms)", icon="CHECKMARK")
+            else:
+                row.label(text=f"{url}: {status['error']}", icon="ERROR")
+
     def draw(self, context):
         layout = self.layout
         scene = context.scene
@@ -164,6 +184,10 @@ class AIR_PT_setup(bpy.types.Panel):
                     icon="INFO",
                     width=width_guess,
                 )
+
+                # or generate the image in tiles
+                row = layout.row()
+                row.prop(props, "use_tiled_generation", text="Generate in Tiles Instead")
             else:
                 utils.label_multiline(
                     layout,
@@ -231,6 +255,20 @@ class AIR_PT_setup(bpy.types.Panel):
             row.separator()
             row.operator(operators.AIR_OT_disable.bl_idname, text="Disable AI Render")
 
+            # show the tile settings if the image will be generated in tiles
+            if props.use_tiled_generation and utils.are_dimensions_too_large(scene):
+                layout.separator()
+                box = layout.box()
+                row = box.row()
+                row.prop(props, "use_tiled_generation", text="Generate in Tiles")
+                row = box.row()
+                row.prop(props, "tile_overlap", text="Overlap")
+                row = box.row()
+                row.prop(props, "tile_max_concurrent", text="Concurrent Tiles")
+
+        # show whether the local servers are up
+        AIR_PT_setup.draw_server_health(layout)
+
 
 class AIR_PT_prompt(bpy.types.Panel):
     bl_label = "Prompt"
@@ -541,6 +579,12 @@ class AIR_PT_operation(bpy.types.Panel):
         split.prop(props, "image_filename_template", text="")
         split.label(text=f".{utils.get_image_format()}")
 
+        # Memory used by AI Render images
+        layout.separator()
+
+        row = layout.row()
+        row.label(text=f"Images in memory: {len(image_pool.get_pooled_images())} ({utils.format_byte_size(image_pool.get_memory_usage())})", icon="IMAGE_DATA")
+
 
 class AIR_PT_upscale(bpy.types.Panel):
     bl_label = "Upscale"
@@ -636,8 +680,23 @@ class AIR_PT_upscale(bpy.types.Panel):
             text=f"Resulting image size: {utils.get_upscaled_width(scene)} x {utils.get_upscaled_height(scene)}"
         )
 
-        # if the dimensions are too large, show message
+        # if the dimensions are too large, show message (or offer to upscale in tiles)
         if not AIR_PT_upscale.are_upscaled_dimensions_small_enough(context):
+            row = layout.row()
+            row.prop(props, "use_tiled_upscaling", text="Upscale in Tiles")
+
+        if not AIR_PT_upscale.are_upscaled_dimensions_small_enough(context) and props.use_tiled_upscaling:
+            utils.label_multiline(
+                layout,
+                text="Upscaled dimensions are too large to upscale in one go, so the image will be upscaled in tiles when you upscale it manually.",
+                icon="INFO",
+                width=width_guess,
+            )
+            row = layout.row()
+            row.prop(props, "tile_overlap", text="Overlap")
+            row = layout.row()
+            row.prop(props, "tile_max_concurrent", text="Concurrent Tiles")
+        elif not AIR_PT_upscale.are_upscaled_dimensions_small_enough(context):
             error_message = (
                 "Upscaled dimensions are too large. Please decrease the scale factor."
                 if AIR_PT_upscale.does_backend_support_choosing_upscale_factor(context)
@@ -813,6 +872,22 @@ class AIR_PT_animation(bpy.types.Panel):
         row = layout.row()
         row.prop(props, "animation_output_path", text="Path")
 
+        row = layout.row()
+        row.prop(props, "animation_max_frames_in_flight", text="Frames In Flight")
+
+        row = layout.row()
+        row.prop(props, "animation_resume", text="Resume (Skip Completed Frames)")
+
+        row = layout.row()
+        row.prop(props, "do_skip_unchanged_renders")
+
+        row = layout.row()
+        row.prop(props, "do_skip_duplicate_frames")
+
+        if props.do_skip_duplicate_frames:
+            row = layout.row()
+            row.prop(props, "duplicate_frame_threshold", text="Threshold")
+
         # Animated Prompts
         layout.separator()
 
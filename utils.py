@@ -24,8 +24,8 @@ import shutil
 import math
 import platform
 import time
-import tempfile
-from . import config
+import types
+from . import config, temp_files
 from .sd_backends import (
     automatic1111_api,
     stability_api,
@@ -51,7 +51,7 @@ def get_addon_preferences(context=None):
 
 
 def create_temp_file(prefix, suffix=".png"):
-    return tempfile.NamedTemporaryFile(prefix=prefix, suffix=suffix).name
+    return temp_files.create_temp_file(prefix, suffix)
 
 
 def sanitize_filename(filename, extra_length=0):
@@ -137,6 +137,11 @@ def copy_file(src, dest):
     shutil.copy2(src, dest)
 
 
+def move_file(src, dest):
+    # this is just a rename (with no copying) when both are on the same drive
+    shutil.move(src, dest)
+
+
 def get_preset_style_thumnails_filepath():
     return get_filepath_in_package("style_thumbnails")
 
@@ -264,10 +269,33 @@ def local_sd_url(context=None):
     return get_addon_preferences(context).local_sd_url
 
 
+def local_sd_urls(context=None):
+    """Get the main local server url, plus any extra servers to spread requests across"""
+    preferences = get_addon_preferences(context)
+    urls = []
+    for url in [preferences.local_sd_url] + re.split(r"[,\s]+", preferences.local_sd_extra_urls):
+        url = url.strip().rstrip("/")
+        if url and url not in urls:
+            urls.append(url)
+    return urls
+
+
 def local_sd_timeout(context=None):
     return get_addon_preferences(context).local_sd_timeout
 
 
+def format_byte_size(size):
+    for unit in ["B", "KB", "MB"]:
+        if size < 1024:
+            return f"{round(size)} {unit}"
+        size /= 1024
+    return f"{round(size, 1)} GB"
+
+
+def temp_files_max_size(context=None):
+    return get_addon_preferences(context).temp_files_max_size * 1024 * 1024
+
+
 def get_output_width(scene):
     return round(scene.render.resolution_x * scene.render.resolution_percentage / 100)
 
@@ -292,30 +320,54 @@ def get_upscaled_height(scene):
     return round(get_output_height(scene) * upscale_factor)
 
 
-def sanitized_upscaled_width(max_upscaled_image_size, scene=None):
-    if not scene:
-        scene = bpy.context.scene
-
-    upscaled_width = get_upscaled_width(scene)
-    upscaled_height = get_upscaled_height(scene)
-
+def get_sanitized_upscaled_dimensions(upscaled_width, upscaled_height, max_upscaled_image_size):
     if upscaled_width * upscaled_height > max_upscaled_image_size:
-        return round(math.sqrt(max_upscaled_image_size * (upscaled_width / upscaled_height)))
+        return (
+            round(math.sqrt(max_upscaled_image_size * (upscaled_width / upscaled_height))),
+            round(math.sqrt(max_upscaled_image_size * (upscaled_height / upscaled_width))),
+        )
     else:
-        return upscaled_width
+        return upscaled_width, upscaled_height
 
 
-def sanitized_upscaled_height(max_upscaled_image_size, scene=None):
-    if not scene:
-        scene = bpy.context.scene
-
-    upscaled_width = get_upscaled_width(scene)
-    upscaled_height = get_upscaled_height(scene)
-
-    if upscaled_width * upscaled_height > max_upscaled_image_size:
-        return round(math.sqrt(max_upscaled_image_size * (upscaled_height / upscaled_width)))
-    else:
-        return upscaled_height
+def snapshot_props(scene):
+    """Copy the AI Render scene properties (and the add-on preferences the backends need)
+    into a plain object that can be safely read from a background thread"""
+    props = scene.air_props
+    snapshot = types.SimpleNamespace(**{
+        name: getattr(props, name)
+        for name in props.bl_rna.properties.keys()
+        if name != "rna_type"
+    })
+
+    # also include the dimensions, which are derived from the render settings
+    snapshot.output_width = get_output_width(scene)
+    snapshot.output_height = get_output_height(scene)
+    snapshot.upscaled_width = get_upscaled_width(scene)
+    snapshot.upscaled_height = get_upscaled_height(scene)
+
+    # and the add-on preferences the backends use while sending requests
+    vars(snapshot).update(vars(snapshot_preferences()))
+
+    return snapshot
+
+
+def snapshot_preferences():
+    """Copy the add-on preferences the backends use while sending requests into a plain
+    object that can be safely read from a background thread"""
+    preferences = get_addon_preferences()
+    return types.SimpleNamespace(
+        local_sd_url=local_sd_url(),
+        local_sd_urls=local_sd_urls(),
+        local_sd_timeout=local_sd_timeout(),
+        local_sd_show_progress=preferences.local_sd_show_progress,
+        local_sd_show_previews=preferences.local_sd_show_previews,
+        local_sd_preview_interval=preferences.local_sd_preview_interval,
+        dream_studio_api_key=get_dream_studio_api_key(),
+        stable_horde_api_key=get_stable_horde_api_key(),
+        http_pool_size=preferences.http_pool_size,
+        http_keep_alive=preferences.http_keep_alive,
+    )
 
 
 def are_dimensions_valid(scene):
@@ -0,0 +1,79 @@
+import concurrent.futures
+import functools
+import traceback
+from . import task_queue
+
+
+# private
+executor = None
+max_workers = 4
+
+
+def get_executor():
+    global executor
+    if executor is None:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-render-worker")
+    return executor
+
+
+def get_result(future):
+    """Get the result of a finished future, treating exceptions and cancellations as a failure"""
+    if future.cancelled():
+        return False
+
+    exception = future.exception()
+    if exception:
+        print("AI Render Error: Exception in background worker")
+        traceback.print_exception(type(exception), exception, exception.__traceback__)
+        return False
+
+    return future.result()
+
+
+def handle_done(on_complete, future):
+    task_queue.add(functools.partial(on_complete, get_result(future)))
+
+
+# public methods
+def ensure_max_workers(num_workers):
+    """Make sure at least this many functions can run on worker threads at the same time"""
+    global executor, max_workers
+    if num_workers <= max_workers:
+        return
+
+    # replace the executor with a bigger one (any work already running on the old
+    # one will still finish)
+    max_workers = num_workers
+    if executor is not None:
+        executor.shutdown(wait=False)
+        executor = None
+
+
+def submit(function, on_complete=None):
+    """Run a function on a background worker thread. When it finishes, on_complete
+    (if given) is called with its result, in the main thread"""
+    future = get_executor().submit(function)
+    if on_complete:
+        add_done_callback(future, on_complete)
+    return future
+
+
+def add_done_callback(future, on_complete):
+    """Call on_complete with a future's result (or False, if it failed), in the main thread"""
+    future.add_done_callback(functools.partial(handle_done, on_complete))
+
+
+def cancel_queued():
+    """Cancel every function that hasn't started running yet (the executor is recreated the
+    next time it's needed)"""
+    global executor
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+        executor = None
+
+
+def unregister():
+    global executor
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+        executor = None